@@ -1,40 +1,89 @@
 import os
 import sys
+import hashlib
 import logging
+import re
 import threading
 import time
-import requests
-import sqlite3
-import json
-from datetime import datetime
-from flask import Flask, redirect, request, session, url_for, render_template, flash
+import orjson
+from datetime import date
+import functools
+from collections import OrderedDict
+from itertools import groupby
+from urllib.parse import urlparse, parse_qs
+from flask import Flask, Response, redirect, request, session, url_for, render_template, flash, stream_with_context
 from flask.json import jsonify
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from flask_socketio import SocketIO, emit
-from kiteconnect import KiteConnect
 
 # Import all supporting functions from services module
 from services import (
     # Database functions
-    init_database, save_level, get_levels, clear_levels_for_today, clear_all_levels,
-    store_alert_response, get_stored_alerts, delete_alert_from_database,
+    init_database, save_level, get_levels, iter_levels, get_levels_version, delete_level,
+    clear_levels_for_today, clear_all_levels,
+    store_alert_response, get_stored_alerts, get_stored_alert, delete_alert_from_database,
     # Session management
+    create_kite_client,
     load_session_data, sync_session_from_file, save_session_data,
     # Alert functions
     send_alert_to_kite, sync_alerts_with_zerodha, get_current_price_for_symbol,
     get_instrument_type, check_price_touch_level, check_alert_triggers,
     update_alert_trigger_status,
+    # Trading functions
+    save_entry_price_to_db, get_trend, iter_trades, iter_paper_trades,
+    check_and_update_trades_from_orders, start_trend_monitoring, start_paper_trade_monitoring,
     # WebSocket functions
     fetch_nifty_prices_websocket, start_continuous_websocket,
-    get_credentials_from_session_or_file,
+    get_credentials_from_session_or_file, get_cached_index_prices, get_index_quotes,
     # Global variables (imported for access)
     user_api_key, user_api_secret, kite, price_history, websocket_prices,
     alert_previous_prices, continuous_websocket_running, continuous_kws
 )
 
-logging.basicConfig(level=logging.DEBUG)
+# LOG_LEVEL=INFO (or higher) skips the per-request/per-tick debug logging
+logging.basicConfig(level=getattr(logging, os.environ.get('LOG_LEVEL', 'DEBUG').upper(), logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# Accepted values for request validation
+VALID_LEVEL_INDEX_TYPES = frozenset({'BANK_NIFTY', 'NIFTY_50'})
+VALID_ENTRY_INSTRUMENTS = frozenset({'NIFTY_50', 'NIFTY_BANK'})
+
+# Kite error text meaning the session is no longer authenticated
+_AUTH_ERROR_RE = re.compile(r'TokenException|Incorrect')
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes with orjson instead of the stdlib json module.
+    
+    Output matches the default provider: keys are sorted, dates go through
+    Flask's default handler (HTTP date strings) and debug responses are indented.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = "thisisasecretkey"   # needed for session handling
+
+# Compress JSON API responses (brotli preferred, gzip fallback). Streamed
+# responses are left alone: Flask-Compress buffers the whole body to compress it
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
 # Set socketio in services module so WebSocket functions can use it
@@ -81,7 +130,7 @@ def login():
             user_api_secret = api_secret
             
             # Initialize KiteConnect with user's API key
-            kite = KiteConnect(api_key=api_key)
+            kite = create_kite_client(api_key)
             
             # Generate login URL
             login_url = kite.login_url()
@@ -89,14 +138,13 @@ def login():
             # Extract redirect token from login URL if present
             redirect_token = None
             try:
-                from urllib.parse import urlparse, parse_qs
                 parsed_url = urlparse(login_url)
                 query_params = parse_qs(parsed_url.query)
                 # The redirect token might be in various parameters
                 redirect_token = query_params.get('redirect_token') or query_params.get('request_token') or query_params.get('token')
                 if redirect_token:
                     redirect_token = redirect_token[0] if isinstance(redirect_token, list) else redirect_token
-            except:
+            except (ValueError, TypeError):
                 pass
             
             # Store in session for callback
@@ -132,7 +180,7 @@ def login_callback():
             return redirect(url_for('login'))
         
         # Initialize KiteConnect with stored credentials
-        kite = KiteConnect(api_key=api_key)
+        kite = create_kite_client(api_key)
         
         # Generate session to get access_token
         data = kite.generate_session(request_token, api_secret=api_secret)
@@ -169,8 +217,7 @@ def prices():
     # Ensure kite is initialized
     if not kite:
         try:
-            kite = KiteConnect(api_key=api_key)
-            kite.set_access_token(access_token)
+            kite = create_kite_client(api_key, access_token)
         except Exception as e:
             flash(f'Error initializing KiteConnect: {str(e)}', 'error')
             return render_template('prices.html', prices=None)
@@ -186,8 +233,7 @@ def prices():
         # If WebSocket failed, fallback to REST API
         if nifty_price == 0 or bank_nifty_price == 0:
             # Fallback to REST API
-            nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-            bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+            nifty_data, bank_nifty_data = get_index_quotes(kite)
             
             prices_data = {
                 'nifty': {
@@ -206,45 +252,47 @@ def prices():
                 }
             }
         else:
-            # Use WebSocket data - need to get additional info from REST API for change/change_percent
-            try:
-                nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-                bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+            # Use WebSocket data; change/change_percent come from the previous close
+            # cached by the WebSocket, or from the REST API until it is available
+            prices_data = get_cached_index_prices()
+            if not prices_data:
+                try:
+                    nifty_data, bank_nifty_data = get_index_quotes(kite)
                 
-                prices_data = {
-                    'nifty': {
-                        'name': 'NIFTY 50',
-                        'current_price': nifty_price,
-                        'change': nifty_data.get('net_change', 0),
-                        'change_percent': nifty_data.get('net_change', 0) / nifty_data.get('ohlc', {}).get('close', 1) * 100 if nifty_data.get('ohlc', {}).get('close') else 0,
-                        'last_updated': websocket_prices_data.get('NIFTY 50', {}).get('timestamp', 'N/A')
-                    },
-                    'bank_nifty': {
-                        'name': 'NIFTY BANK',
-                        'current_price': bank_nifty_price,
-                        'change': bank_nifty_data.get('net_change', 0),
-                        'change_percent': bank_nifty_data.get('net_change', 0) / bank_nifty_data.get('ohlc', {}).get('close', 1) * 100 if bank_nifty_data.get('ohlc', {}).get('close') else 0,
-                        'last_updated': websocket_prices_data.get('NIFTY BANK', {}).get('timestamp', 'N/A')
+                    prices_data = {
+                        'nifty': {
+                            'name': 'NIFTY 50',
+                            'current_price': nifty_price,
+                            'change': nifty_data.get('net_change', 0),
+                            'change_percent': nifty_data.get('net_change', 0) / nifty_data.get('ohlc', {}).get('close', 1) * 100 if nifty_data.get('ohlc', {}).get('close') else 0,
+                            'last_updated': websocket_prices_data.get('NIFTY 50', {}).get('timestamp', 'N/A')
+                        },
+                        'bank_nifty': {
+                            'name': 'NIFTY BANK',
+                            'current_price': bank_nifty_price,
+                            'change': bank_nifty_data.get('net_change', 0),
+                            'change_percent': bank_nifty_data.get('net_change', 0) / bank_nifty_data.get('ohlc', {}).get('close', 1) * 100 if bank_nifty_data.get('ohlc', {}).get('close') else 0,
+                            'last_updated': websocket_prices_data.get('NIFTY BANK', {}).get('timestamp', 'N/A')
+                        }
                     }
-                }
-            except:
-                # If REST API fails, use WebSocket data only
-                prices_data = {
-                    'nifty': {
-                        'name': 'NIFTY 50',
-                        'current_price': nifty_price,
-                        'change': 0,
-                        'change_percent': 0,
-                        'last_updated': websocket_prices_data.get('NIFTY 50', {}).get('timestamp', 'N/A')
-                    },
-                    'bank_nifty': {
-                        'name': 'NIFTY BANK',
-                        'current_price': bank_nifty_price,
-                        'change': 0,
-                        'change_percent': 0,
-                        'last_updated': websocket_prices_data.get('NIFTY BANK', {}).get('timestamp', 'N/A')
+                except Exception:
+                    # If REST API fails, use WebSocket data only
+                    prices_data = {
+                        'nifty': {
+                            'name': 'NIFTY 50',
+                            'current_price': nifty_price,
+                            'change': 0,
+                            'change_percent': 0,
+                            'last_updated': websocket_prices_data.get('NIFTY 50', {}).get('timestamp', 'N/A')
+                        },
+                        'bank_nifty': {
+                            'name': 'NIFTY BANK',
+                            'current_price': bank_nifty_price,
+                            'change': 0,
+                            'change_percent': 0,
+                            'last_updated': websocket_prices_data.get('NIFTY BANK', {}).get('timestamp', 'N/A')
+                        }
                     }
-                }
         
         # Get Zerodha tokens from session if available
         access_token_display = session.get('access_token') or access_token
@@ -278,8 +326,7 @@ def fetch_prices_websocket():
     global kite
     if not kite:
         try:
-            kite = KiteConnect(api_key=api_key)
-            kite.set_access_token(access_token)
+            kite = create_kite_client(api_key, access_token)
         except Exception as e:
             return jsonify({'error': f'Error initializing KiteConnect: {str(e)}'}), 500
     
@@ -287,14 +334,20 @@ def fetch_prices_websocket():
         # Fetch prices using WebSocket
         websocket_prices_data = fetch_nifty_prices_websocket(timeout=10)
         
+        # Serve change/change_percent from the WebSocket cache when it is complete
+        cached_prices = get_cached_index_prices()
+        if cached_prices:
+            for price_data in cached_prices.values():
+                price_data['error'] = None
+            return jsonify(cached_prices)
+        
         # Get additional data (change, change_percent) from REST API
         nifty_price = websocket_prices_data.get('NIFTY 50', {}).get('last_price', 0)
         bank_nifty_price = websocket_prices_data.get('NIFTY BANK', {}).get('last_price', 0)
         
         # Get change data from REST API
         try:
-            nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-            bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+            nifty_data, bank_nifty_data = get_index_quotes(kite)
             
             # Format the data to match the template structure
             formatted_data = {
@@ -363,7 +416,7 @@ def create_alert():
     
     try:
         # Get alert data from request
-        data = request.get_json()
+        data = request.get_json(silent=True, cache=False) or {}
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
@@ -417,9 +470,6 @@ def get_alerts():
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        # First, sync alerts to remove any orphaned alerts from database
-        sync_alerts_with_zerodha()
-        
         # Get API credentials from session
         api_key = session.get('api_key')
         access_token = session.get('access_token')
@@ -431,13 +481,17 @@ def get_alerts():
         }
         
         # Send GET request to KITE alerts API
-        response = requests.get(
+        response = services.kite_rest_session.get(
             'https://api.kite.trade/alerts',
             headers=headers
         )
         
         if response.status_code == 200:
-            return jsonify({'alerts': response.json(), 'success': True}), 200
+            alerts = response.json()
+            # Sync against the same response to remove any orphaned alerts from
+            # database, instead of fetching the alert list from Zerodha twice
+            sync_alerts_with_zerodha(alerts)
+            return jsonify({'alerts': alerts, 'success': True}), 200
         else:
             return jsonify({'error': f'Failed to fetch alerts: {response.text}', 'success': False}), 500
             
@@ -474,46 +528,9 @@ def get_stored_alert_by_uuid(uuid):
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        import sqlite3
-        import json
-        conn = sqlite3.connect(services.DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT uuid, name, user_id, lhs_exchange, lhs_tradingsymbol, lhs_attribute,
-                   operator, rhs_type, rhs_constant, rhs_exchange, rhs_tradingsymbol,
-                   rhs_attribute, type, status, alert_count, disabled_reason,
-                   created_at, updated_at, stored_at, kite_response
-            FROM alerts
-            WHERE uuid = ?
-        ''', (uuid,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            alert = {
-                'uuid': row[0],
-                'name': row[1],
-                'user_id': row[2],
-                'lhs_exchange': row[3],
-                'lhs_tradingsymbol': row[4],
-                'lhs_attribute': row[5],
-                'operator': row[6],
-                'rhs_type': row[7],
-                'rhs_constant': row[8],
-                'rhs_exchange': row[9],
-                'rhs_tradingsymbol': row[10],
-                'rhs_attribute': row[11],
-                'type': row[12],
-                'status': row[13],
-                'alert_count': row[14],
-                'disabled_reason': row[15],
-                'created_at': row[16],
-                'updated_at': row[17],
-                'stored_at': row[18],
-                'kite_response': json.loads(row[19])
-            }
+        alert = get_stored_alert(uuid)
+        
+        if alert:
             return jsonify({'alert': alert, 'success': True}), 200
         else:
             return jsonify({'error': 'Alert not found'}), 404
@@ -554,7 +571,6 @@ def delete_alert(uuid):
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        import requests
         # Get API credentials from session
         api_key = session.get('api_key')
         access_token = session.get('access_token')
@@ -569,7 +585,7 @@ def delete_alert(uuid):
         
         # Send DELETE request to KITE alerts API
         print(f"Sending DELETE request to: https://api.kite.trade/alerts/{uuid}")
-        response = requests.delete(
+        response = services.kite_rest_session.delete(
             f'https://api.kite.trade/alerts/{uuid}',
             headers=headers
         )
@@ -662,7 +678,7 @@ def get_alert_prices():
         print(f"Error in get_alert_prices: {error_msg}")
         
         # Check if it's a token error
-        if "TokenException" in error_msg or "Incorrect" in error_msg:
+        if _AUTH_ERROR_RE.search(error_msg):
             return jsonify({'error': 'Authentication failed. Please login again.', 'success': False}), 401
         else:
             return jsonify({'error': f'Error fetching alert prices: {error_msg}', 'success': False}), 500
@@ -692,105 +708,204 @@ def debug_auth():
     
     return jsonify(debug_info)
 
+def json_errors(action):
+    """
+    Turn unhandled exceptions in a JSON API route into an error response.
+    
+    Args:
+        action: What the route was doing, used in the message ("Error <action>: ...")
+    
+    Returns:
+        Decorator returning {'error': ..., 'success': False} with status 500
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                return f(*args, **kwargs)
+            except Exception as e:
+                print(f"Error {action}: {e}")
+                return jsonify({'error': f'Error {action}: {str(e)}', 'success': False}), 500
+        return wrapper
+    return decorator
+
 @app.route('/levels/save', methods=['POST'])
+@json_errors('saving level')
 def save_level_endpoint():
     """API endpoint to save a level (supports dynamic levels)"""
-    try:
-        data = request.get_json()
-        index_type = data.get('index_type')  # 'BANK_NIFTY' or 'NIFTY_50'
-        level_value = data.get('level_value')
-        level_uuid = data.get('uuid')  # Optional: for updating existing level
-        
-        if not all([index_type, level_value]):
-            return jsonify({'error': 'Missing required fields (index_type, level_value)', 'success': False}), 400
-        
-        if index_type not in ['BANK_NIFTY', 'NIFTY_50']:
-            return jsonify({'error': 'Invalid index_type. Must be BANK_NIFTY or NIFTY_50', 'success': False}), 400
-        
-        if not isinstance(level_value, (int, float)) or level_value <= 0:
-            return jsonify({'error': 'level_value must be a positive number', 'success': False}), 400
-        
-        # Use a default user_id for now (you can modify this based on your auth system)
-        user_id = 'default_user'
-        
-        result_uuid = save_level(user_id, index_type, level_value, level_uuid)
-        
-        if result_uuid:
-            return jsonify({
-                'message': 'Level saved successfully', 
-                'success': True, 
-                'uuid': result_uuid
-            }), 200
-        else:
-            return jsonify({'error': 'Failed to save level', 'success': False}), 500
-            
-    except Exception as e:
-        return jsonify({'error': f'Error saving level: {str(e)}', 'success': False}), 500
+    data = request.get_json(silent=True, cache=False) or {}
+    index_type = data.get('index_type')  # 'BANK_NIFTY' or 'NIFTY_50'
+    level_value = data.get('level_value')
+    level_uuid = data.get('uuid')  # Optional: for updating existing level
+    
+    if not index_type or not level_value:
+        return jsonify({'error': 'Missing required fields (index_type, level_value)', 'success': False}), 400
+    
+    # Field types are checked strictly (no coercion); bool is rejected even
+    # though it is an int subclass
+    if not isinstance(index_type, str) or index_type not in VALID_LEVEL_INDEX_TYPES:
+        return jsonify({'error': 'Invalid index_type. Must be BANK_NIFTY or NIFTY_50', 'success': False}), 400
+    
+    if isinstance(level_value, bool) or not isinstance(level_value, (int, float)) or level_value <= 0:
+        return jsonify({'error': 'level_value must be a positive number', 'success': False}), 400
+    
+    if level_uuid is not None and not isinstance(level_uuid, str):
+        return jsonify({'error': 'uuid must be a string', 'success': False}), 400
+    
+    # Use a default user_id for now (you can modify this based on your auth system)
+    user_id = 'default_user'
+    
+    result_uuid = save_level(user_id, index_type, level_value, level_uuid)
+    
+    if result_uuid:
+        return jsonify({
+            'message': 'Level saved successfully', 
+            'success': True, 
+            'uuid': result_uuid
+        }), 200
+    else:
+        return jsonify({'error': 'Failed to save level', 'success': False}), 500
+
+_TRUE_VALUES = frozenset({'true', '1', 'yes', 'on'})
+
+def _bool_arg(name, default=False):
+    """Read a boolean query-string flag ('true', '1', 'yes' or 'on', any case)"""
+    value = request.args.get(name)
+    return value.lower() in _TRUE_VALUES if value else default
+
+# Serialized /levels/get bodies keyed by (user_id, version, index_type, today);
+# version and today are only part of the key, so stale entries just age out
+_LEVELS_BODY_CACHE_SIZE = 64
+_levels_body_cache = OrderedDict()
+_levels_body_cache_lock = threading.Lock()
+
+def _levels_response_body(user_id, version, index_type, today):
+    """Serialized /levels/get body for one version of a user's levels
+    
+    Read errors propagate to the caller and are never cached. A body is only
+    cached when the version is unchanged after the read, i.e. no write landed
+    while it was being built.
+    
+    Returns:
+        tuple: (body, cacheable) - cacheable is False if the levels changed mid-read
+    """
+    key = (user_id, version, index_type, today)
+    with _levels_body_cache_lock:
+        body = _levels_body_cache.get(key)
+        if body is not None:
+            _levels_body_cache.move_to_end(key)
+            return body, True
+    
+    levels = get_levels(user_id, index_type, today is not None)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Returning levels: BANK_NIFTY=%d, NIFTY_50=%d",
+                     len(levels['BANK_NIFTY']), len(levels['NIFTY_50']))
+    body = app.json.dumps({'levels': levels, 'success': True})
+    
+    if get_levels_version(user_id) != version:
+        return body, False
+    with _levels_body_cache_lock:
+        _levels_body_cache[key] = body
+        if len(_levels_body_cache) > _LEVELS_BODY_CACHE_SIZE:
+            _levels_body_cache.popitem(last=False)
+    return body, True
 
 @app.route('/levels/get', methods=['GET'])
+@json_errors('getting levels')
 def get_levels_endpoint():
     """API endpoint to get all levels"""
-    try:
-        # Use a default user_id for now (you can modify this based on your auth system)
-        user_id = 'default_user'
-        index_type = request.args.get('index_type')  # Optional filter
-        today_only = request.args.get('today_only', 'false').lower() == 'true'  # Optional filter for today's levels only
-        
+    # Use a default user_id for now (you can modify this based on your auth system)
+    user_id = 'default_user'
+    index_type = request.args.get('index_type')  # Optional filter
+    today_only = _bool_arg('today_only')  # Optional filter for today's levels only
+    
+    version = get_levels_version(user_id)
+    if version is None:
+        # Version unavailable: serve fresh data without caching
         levels = get_levels(user_id, index_type, today_only)
-        print(f"Returning levels: BANK_NIFTY={len(levels['BANK_NIFTY'])}, NIFTY_50={len(levels['NIFTY_50'])}")
         return jsonify({'levels': levels, 'success': True}), 200
-        
-    except Exception as e:
-        print(f"Error in get_levels_endpoint: {e}")
-        return jsonify({'error': f'Error getting levels: {str(e)}', 'success': False}), 500
+    
+    # today_only results change at midnight, so the date is part of the key
+    today = date.today().isoformat() if today_only else None
+    etag = hashlib.blake2b(f"{user_id}:{version}:{index_type}:{today}".encode(),
+                           digest_size=16).hexdigest()
+    
+    # Polling clients that already hold this version get an empty 304
+    # (Flask-Compress appends ':<encoding>' to the ETag of compressed bodies)
+    if any(tag.partition(':')[0] == etag for tag in request.if_none_match.as_set()):
+        response = Response(status=304)
+    else:
+        body, cacheable = _levels_response_body(user_id, version, index_type, today)
+        response = Response(body, mimetype='application/json')
+        if not cacheable:
+            # The body may be newer than the version the ETag names
+            return response
+    response.set_etag(etag)
+    return response
+
+@app.route('/levels/stream', methods=['GET'])
+@json_errors('streaming levels')
+def stream_levels_endpoint():
+    """
+    API endpoint to stream levels as newline-delimited JSON.
+    
+    One line is written per index type as soon as its rows have been read:
+    {"index_type": "BANK_NIFTY", "levels": [...]}. Accepts the same
+    index_type / today_only filters as /levels/get. If reading fails after
+    the response has started, a final {"success": false, "error": ...} line
+    is written.
+    """
+    user_id = 'default_user'
+    index_type = request.args.get('index_type')  # Optional filter
+    today_only = _bool_arg('today_only')  # Optional filter for today's levels only
+    
+    def generate():
+        # Rows arrive ordered by index_type, so each group is contiguous
+        rows = iter_levels(user_id, index_type, today_only)
+        try:
+            for idx_type, group in groupby(rows, key=lambda row: row[0]):
+                levels = [level for _, level in group]
+                yield app.json.dumps({'index_type': idx_type, 'levels': levels}) + '\n'
+        except Exception as e:
+            # Headers are already sent, so the error goes in a last line
+            print(f"Error streaming levels: {e}")
+            yield app.json.dumps({'success': False, 'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/levels/clear', methods=['POST'])
+@json_errors('clearing levels')
 def clear_levels_endpoint():
     """API endpoint to clear levels (for daily refresh)"""
-    try:
-        data = request.get_json() or {}
-        index_type = data.get('index_type')  # Optional: clear specific index type
-        clear_today_only = data.get('today_only', False)  # If True, only clear today's levels
-        
-        user_id = 'default_user'
-        
-        if clear_today_only:
-            deleted_count = clear_levels_for_today(user_id)
-        else:
-            deleted_count = clear_all_levels(user_id, index_type)
-        
-        return jsonify({
-            'message': f'Cleared {deleted_count} level(s)', 
-            'success': True,
-            'deleted_count': deleted_count
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': f'Error clearing levels: {str(e)}', 'success': False}), 500
+    data = request.get_json(silent=True, cache=False) or {}
+    index_type = data.get('index_type')  # Optional: clear specific index type
+    clear_today_only = data.get('today_only', False)  # If True, only clear today's levels
+    
+    user_id = 'default_user'
+    
+    if clear_today_only:
+        deleted_count = clear_levels_for_today(user_id)
+    else:
+        deleted_count = clear_all_levels(user_id, index_type)
+    
+    return jsonify({
+        'message': f'Cleared {deleted_count} level(s)', 
+        'success': True,
+        'deleted_count': deleted_count
+    }), 200
 
 @app.route('/levels/delete/<uuid>', methods=['DELETE'])
+@json_errors('deleting level')
 def delete_level_endpoint(uuid):
     """API endpoint to delete a level by UUID"""
-    try:
-        import sqlite3
-        conn = sqlite3.connect(services.DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Check if level exists
-        cursor.execute('SELECT uuid FROM level WHERE uuid = ?', (uuid,))
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({'error': 'Level not found', 'success': False}), 404
-        
-        # Delete the level
-        cursor.execute('DELETE FROM level WHERE uuid = ?', (uuid,))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'message': 'Level deleted successfully', 'success': True}), 200
-        
-    except Exception as e:
-        return jsonify({'error': f'Error deleting level: {str(e)}', 'success': False}), 500
+    deleted_count = delete_level(uuid)
+    
+    if deleted_count is None:
+        return jsonify({'error': 'Failed to delete level', 'success': False}), 500
+    if deleted_count == 0:
+        return jsonify({'error': 'Level not found', 'success': False}), 404
+    
+    return jsonify({'message': 'Level deleted successfully', 'success': True}), 200
 
 @app.route('/session/status')
 def session_status():
@@ -832,20 +947,60 @@ def logout():
 # Trading/Trend Detection API Endpoints
 # ============================================================================
 
+STREAM_BATCH_SIZE = 1000  # Rows serialized per chunk when streaming JSON lists
+
+def stream_json_list(key, items, **extra):
+    """
+    Stream a JSON object holding a (possibly large) list without building the
+    whole response body in memory.
+    
+    Args:
+        key: Name of the list field in the response object
+        items: Iterable of JSON-serializable dicts
+        **extra: Additional top-level fields; 'count' is added automatically
+    
+    If reading items fails part-way, the list is closed with the rows sent so
+    far and the trailer reports "success": false with the error instead of
+    the extra fields' success value.
+    
+    Returns:
+        Response: Chunked application/json response
+    """
+    def generate():
+        yield '{"%s": [' % key
+        count = 0
+        batch = []
+        trailer = extra
+        try:
+            for item in items:
+                batch.append(item)
+                if len(batch) == STREAM_BATCH_SIZE:
+                    yield (', ' if count else '') + app.json.dumps(batch)[1:-1]
+                    count += len(batch)
+                    batch = []
+        except Exception as e:
+            # Headers are already sent, so the error goes in the trailer
+            print(f"Error streaming {key}: {e}")
+            trailer = dict(extra, success=False, error=str(e))
+        if batch:
+            yield (', ' if count else '') + app.json.dumps(batch)[1:-1]
+            count += len(batch)
+        yield '], ' + app.json.dumps(dict(trailer, count=count))[1:]
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @app.route('/trading/set-entry-price', methods=['POST'])
 def set_entry_price():
     """API endpoint to set entry price for an instrument (saves to DB and updates cache)"""
     try:
-        from services import save_entry_price_to_db
-        
-        data = request.get_json()
+        data = request.get_json(silent=True, cache=False) or {}
         instrument = data.get('instrument')  # 'NIFTY_50' or 'NIFTY_BANK'
         entry_price = data.get('entry_price')
         
         if not instrument or entry_price is None:
             return jsonify({'error': 'Missing required fields (instrument, entry_price)', 'success': False}), 400
         
-        if instrument not in ['NIFTY_50', 'NIFTY_BANK']:
+        if instrument not in VALID_ENTRY_INSTRUMENTS:
             return jsonify({'error': 'Invalid instrument. Must be NIFTY_50 or NIFTY_BANK', 'success': False}), 400
         
         if not isinstance(entry_price, (int, float)) or entry_price <= 0:
@@ -871,7 +1026,11 @@ def set_entry_price():
 def get_trend_status():
     """API endpoint to get current trend status for instruments"""
     try:
-        from services import get_trend, nifty_prices, bank_nifty_prices, entry_prices_cache, previous_trends
+        # Module attributes, not imported names: entry_prices_cache is rebound on reload
+        nifty_prices = services.nifty_prices
+        bank_nifty_prices = services.bank_nifty_prices
+        entry_prices_cache = services.entry_prices_cache
+        previous_trends = services.previous_trends
         
         nifty_trend = get_trend(nifty_prices)
         bank_nifty_trend = get_trend(bank_nifty_prices)
@@ -883,14 +1042,14 @@ def get_trend_status():
                     'previous_trend': previous_trends.get('NIFTY_50'),
                     'price_count': len(nifty_prices),
                     'entry_price': entry_prices_cache.get('NIFTY_50'),
-                    'current_price': list(nifty_prices)[-1] if nifty_prices else None
+                    'current_price': nifty_prices[-1] if nifty_prices else None
                 },
                 'NIFTY_BANK': {
                     'trend': bank_nifty_trend,
                     'previous_trend': previous_trends.get('NIFTY_BANK'),
                     'price_count': len(bank_nifty_prices),
                     'entry_price': entry_prices_cache.get('NIFTY_BANK'),
-                    'current_price': list(bank_nifty_prices)[-1] if bank_nifty_prices else None
+                    'current_price': bank_nifty_prices[-1] if bank_nifty_prices else None
                 }
             },
             'success': True
@@ -903,24 +1062,22 @@ def get_trend_status():
 def get_trades_endpoint():
     """API endpoint to get all live trades"""
     try:
-        from services import get_trades, check_and_update_trades_from_orders, kite, PAPER_TRADING_ENABLED
+        # services.kite is rebound on login, so read it at call time
+        kite = services.kite
         
         # Check and update trades from recent orders (only for live trading)
-        if kite and not PAPER_TRADING_ENABLED:
+        if kite and not services.PAPER_TRADING_ENABLED:
             check_and_update_trades_from_orders(kite)
         
         # Get status filter from query params
         status = request.args.get('status')  # 'OPEN' or 'CLOSED'
         instrument = request.args.get('instrument')  # 'NIFTY_50' or 'NIFTY_BANK'
         
-        trades = get_trades(status=status, instrument=instrument)
+        # Rows are read from the database as the response is streamed
+        trades = iter_trades(status=status, instrument=instrument)
         
-        return jsonify({
-            'trades': trades,
-            'count': len(trades),
-            'paper_trading': PAPER_TRADING_ENABLED,
-            'success': True
-        }), 200
+        return stream_json_list('trades', trades,
+                                paper_trading=services.PAPER_TRADING_ENABLED, success=True)
         
     except Exception as e:
         return jsonify({'error': f'Error getting trades: {str(e)}', 'success': False}), 500
@@ -929,21 +1086,21 @@ def get_trades_endpoint():
 def get_paper_trades_endpoint():
     """API endpoint to get all paper trades"""
     try:
-        from services import get_paper_trades
-        
         # Get filters from query params
         status = request.args.get('status')  # 'OPEN' or 'CLOSED'
         instrument = request.args.get('instrument')  # 'NIFTY_50' or 'NIFTY_BANK'
-        date_filter = request.args.get('date')  # 'YYYY-MM-DD' format, defaults to today if None
+        date_filter = request.args.get('date') or date.today().isoformat()  # 'YYYY-MM-DD' format, defaults to today
+        
+        # Validate before streaming starts, so a bad date is a 400 and not a failed stream
+        try:
+            date_filter = date.fromisoformat(date_filter).isoformat()
+        except ValueError:
+            return jsonify({'error': 'Invalid date. Must be in YYYY-MM-DD format', 'success': False}), 400
         
-        trades = get_paper_trades(status=status, instrument=instrument, date_filter=date_filter)
+        # Rows are read from the database as the response is streamed
+        trades = iter_paper_trades(status=status, instrument=instrument, date_filter=date_filter)
         
-        return jsonify({
-            'trades': trades,
-            'count': len(trades),
-            'date_filter': date_filter or datetime.now().date().isoformat(),
-            'success': True
-        }), 200
+        return stream_json_list('trades', trades, date_filter=date_filter, success=True)
         
     except Exception as e:
         return jsonify({'error': f'Error getting paper trades: {str(e)}', 'success': False}), 500
@@ -952,7 +1109,7 @@ def get_paper_trades_endpoint():
 def update_trades_endpoint():
     """API endpoint to manually trigger trade status update from orders"""
     try:
-        from services import check_and_update_trades_from_orders, kite
+        kite = services.kite
         
         if not kite:
             return jsonify({'error': 'KiteConnect not initialized', 'success': False}), 400
@@ -975,7 +1132,6 @@ def update_trades_endpoint():
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    from flask import request
     print(f"Client connected: {request.sid}")
     emit('connected', {'status': 'connected'})
     
@@ -986,11 +1142,16 @@ def handle_connect():
     
     # Send current prices if available
     if websocket_prices['NIFTY 50']['last_price'] > 0 or websocket_prices['NIFTY BANK']['last_price'] > 0:
+        # Everything needed is already cached once the WebSocket has a previous close
+        current_prices = get_cached_index_prices()
+        if current_prices:
+            emit('price_update', current_prices)
+            return
+        
         try:
             global kite
             if kite:
-                nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-                bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+                nifty_data, bank_nifty_data = get_index_quotes(kite)
                 
                 # Calculate change and change_percent using previous_close from WebSocket if available
                 nifty_current = websocket_prices['NIFTY 50']['last_price'] or nifty_data.get('last_price', 0)
@@ -1036,7 +1197,6 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    from flask import request
     print(f"Client disconnected: {request.sid}")
 
 # ============================================================================
@@ -1058,9 +1218,6 @@ def internal_error(error):
 # ============================================================================
 
 if __name__ == '__main__':
-    import os
-    import sys
-    
     # Check if we're running in debug mode from UI
     is_debugging = (
         '--debug' in sys.argv or 
@@ -1072,12 +1229,18 @@ if __name__ == '__main__':
     
     port = 5001
     
-    # Set environment variables to prevent multiple processes during debugging
-    os.environ['FLASK_ENV'] = 'development'
-    os.environ['FLASK_DEBUG'] = '1'
+    # APP_DEBUG=0 runs without Flask's debug mode (no Werkzeug debugger or reloader)
+    # Note: keep a single server process; trading state, order flags and the
+    # KiteTicker/monitor threads live in module globals and must not be duplicated
+    debug_mode = os.environ.get('APP_DEBUG', '1').lower() not in ('0', 'false', 'no', 'off')
+    
+    if debug_mode:
+        # Set environment variables to prevent multiple processes during debugging
+        os.environ['FLASK_ENV'] = 'development'
+        os.environ['FLASK_DEBUG'] = '1'
     
     # Disable Flask's auto-reloader when debugging to prevent multiple instances
-    use_reloader = not is_debugging
+    use_reloader = debug_mode and not is_debugging
     
     print(f"🚀 Starting Flask app on port {port}")
     print("📊 Levels database storage enabled")
@@ -1103,11 +1266,10 @@ if __name__ == '__main__':
         threading.Thread(target=start_websocket_on_startup, daemon=True).start()
     
     # Start trend monitoring background thread
-    from services import start_trend_monitoring, start_paper_trade_monitoring, PAPER_TRADING_ENABLED
     start_trend_monitoring()
     
     # Start paper trade monitoring background thread if paper trading is enabled
-    if PAPER_TRADING_ENABLED:
+    if services.PAPER_TRADING_ENABLED:
         start_paper_trade_monitoring()
         print("📝 Paper trading mode: ENABLED")
     else:
@@ -1116,7 +1278,7 @@ if __name__ == '__main__':
     # Run with SocketIO (supports WebSocket)
     socketio.run(
         app,
-        debug=True,
+        debug=debug_mode,
         host='0.0.0.0',
         port=port,
         use_reloader=use_reloader,
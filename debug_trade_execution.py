@@ -93,14 +93,11 @@ try:
     nifty_last = last_order_time.get('NIFTY_50')
     bank_last = last_order_time.get('NIFTY_BANK')
     if nifty_last:
-        from datetime import datetime
-        last_time = datetime.fromisoformat(nifty_last)
-        elapsed = (datetime.now() - last_time).total_seconds()
+        # last_order_time holds time.monotonic() readings
+        elapsed = time.monotonic() - nifty_last
         print(f"   NIFTY_50 last order: {elapsed:.1f} seconds ago")
     if bank_last:
-        from datetime import datetime
-        last_time = datetime.fromisoformat(bank_last)
-        elapsed = (datetime.now() - last_time).total_seconds()
+        elapsed = time.monotonic() - bank_last
         print(f"   NIFTY_BANK last order: {elapsed:.1f} seconds ago")
     
     print()
@@ -5,24 +5,34 @@ and WebSocket handling functions.
 """
 
 from typing import Any
+import atexit
 import os
 import json
+import logging
+import queue
+import re
 import requests
+from urllib3.util import Retry
 import sqlite3
-import uuid
-from collections import deque
-from datetime import datetime
-from flask import session, has_request_context, request
-from flask.json import jsonify
-from flask_socketio import emit
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from secrets import token_hex
+from flask import session, has_request_context
 from kiteconnect import KiteConnect, KiteTicker
 import threading
 import time
+import traceback
 import numpy as np
 
 # Import socketio from app (will be set by app.py)
 socketio = None
 
+# Logger for high-frequency diagnostics (per tick / per level); kept off stdout
+# unless DEBUG logging is enabled
+logger = logging.getLogger(__name__)
+
 # Constants
 SESSION_FILE = 'session_data.json'
 DATABASE_FILE = 'app.db'
@@ -33,6 +43,13 @@ user_api_secret = None
 kite = None
 price_history: deque[Any] = deque(maxlen=20)  # window of last 20 ticks
 
+# Shared HTTP session for direct Kite REST calls (alerts API), so requests reuse
+# pooled keep-alive connections instead of a new TCP/TLS handshake per call
+kite_rest_session = requests.Session()
+
+# Entry appended to price_history for every index tick (a tuple, no per-tick dict)
+PriceTick = namedtuple('PriceTick', ['instrument', 'price', 'timestamp'])
+
 # Global dictionary to store WebSocket prices
 websocket_prices = {
     'NIFTY 50': {'last_price': 0, 'timestamp': None, 'previous_close': 0},
@@ -40,7 +57,7 @@ websocket_prices = {
 }
 
 # Global dictionary to store option prices from WebSocket (for paper trading)
-# Key: tradingsymbol (e.g., "NIFTY26DEC23000CE"), Value: {'last_price': price, 'timestamp': timestamp}
+# Key: tradingsymbol (e.g., "NIFTY26DEC23000CE"), Value: {'last_price': price, 'timestamp': timestamp, 'received_at': epoch}
 option_websocket_prices = {}
 
 # Mapping from instrument_token to tradingsymbol for options (for WebSocket price tracking)
@@ -86,8 +103,12 @@ order_placed_at_level = {}
 # Dictionary: {'level_uuid': 'above'/'below'/'at'}
 previous_price_position_by_level = {}
 
+# Number of times each level has been checked (throttles the per-level debug log)
+# Dictionary: {'level_uuid': count}
+level_check_counts = {}
+
 # Track last order time to prevent placing orders too frequently
-# Dictionary: {'NIFTY_50': timestamp, 'NIFTY_BANK': timestamp}
+# Dictionary: {'NIFTY_50': time.monotonic() seconds, 'NIFTY_BANK': time.monotonic() seconds}
 last_order_time = {
     'NIFTY_50': None,
     'NIFTY_BANK': None
@@ -104,6 +125,12 @@ previous_price_position = {
 trend_monitoring_running = False
 trend_monitoring_thread = None
 
+# Set by on_tick when an index price is appended, to wake the trend monitor
+trend_price_event = threading.Event()
+
+# Serializes starting the background monitoring threads
+_monitoring_start_lock = threading.Lock()
+
 # Feature flag for paper trading
 PAPER_TRADING_ENABLED = True  # Set to False for live trading
 
@@ -111,11 +138,122 @@ PAPER_TRADING_ENABLED = True  # Set to False for live trading
 paper_trade_monitoring_running = False
 paper_trade_monitoring_thread = None
 
+# Set by the WebSocket when option prices arrive, to wake the paper trade monitor
+paper_trade_price_event = threading.Event()
+
+# Minimum time between paper trade monitor passes (seconds), even when woken early
+PAPER_MONITOR_MIN_INTERVAL = 0.2
+
+# How often the paper trade monitor writes open trades' current prices (seconds);
+# exits are still written as soon as they are detected
+PAPER_TRADE_PRICE_FLUSH_INTERVAL = 2.0
+
+
+# ============================================================================
+# Kite Client
+# ============================================================================
+
+# HTTP connection pool for KiteConnect's requests session: quote/instrument/order
+# calls from the routes and monitor threads reuse kept-alive TLS connections.
+# Retries only cover connection failures and idempotent methods (urllib3 does not
+# retry POST reads), so an order is never sent twice
+KITE_HTTP_POOL = {
+    'pool_connections': 4,
+    'pool_maxsize': 10,
+    'max_retries': Retry(total=2, backoff_factor=0.2),
+}
+
+def create_kite_client(api_key, access_token=None):
+    """
+    Create a KiteConnect client using the shared HTTP pool configuration.
+    
+    Args:
+        api_key: Kite API key
+        access_token: Optional access token to set on the client
+    
+    Returns:
+        KiteConnect: Client instance
+    """
+    client = KiteConnect(api_key=api_key, pool=KITE_HTTP_POOL)
+    if access_token:
+        client.set_access_token(access_token)
+    return client
+
+# Instruments per kite.quote() request
+QUOTE_BATCH_SIZE = 200
+
+INDEX_QUOTE_KEYS = ("NSE:NIFTY 50", "NSE:NIFTY BANK")
+
+# Error/close-reason text that points at an authentication problem, matched in
+# one pass (only "upgrade failed" and "expired" are case-insensitive)
+_WS_FORBIDDEN_RE = re.compile(r'403|Forbidden')
+_WS_CLOSE_AUTH_RE = re.compile(r'403|Forbidden|(?i:upgrade failed)')
+_TOKEN_ERROR_RE = re.compile(r'TokenException|Invalid|(?i:expired)')
+
+# Quotes fetched within the last QUOTE_CACHE_TTL seconds are reused, so UI polls
+# and monitor passes landing close together share one request
+QUOTE_CACHE_TTL = 0.5
+_quote_cache = {}  # {instrument_key: (expires_at, quote data)}
+
+def get_quotes(instrument_keys, client=None):
+    """
+    Get quotes for several instruments with one kite.quote() request per batch.
+    
+    Quotes still in the short-lived cache are not requested again.
+    
+    Args:
+        instrument_keys: Sequence of "EXCHANGE:TRADINGSYMBOL" keys
+        client: KiteConnect instance (defaults to the module client)
+    
+    Returns:
+        dict: {instrument_key: quote data}; keys Kite did not return are missing
+    """
+    client = client or kite
+    now = time.monotonic()
+    
+    quotes = {}
+    missing = []
+    for key in instrument_keys:
+        entry = _quote_cache.get(key)
+        if entry and entry[0] > now:
+            quotes[key] = entry[1]
+        else:
+            missing.append(key)
+    
+    for start in range(0, len(missing), QUOTE_BATCH_SIZE):
+        fetched = client.quote(missing[start:start + QUOTE_BATCH_SIZE])
+        expires_at = time.monotonic() + QUOTE_CACHE_TTL
+        for key, data in fetched.items():
+            _quote_cache[key] = (expires_at, data)
+        quotes.update(fetched)
+    return quotes
+
+def get_index_quotes(client=None):
+    """
+    Get NIFTY 50 and NIFTY BANK quotes in a single kite.quote() request.
+    
+    Args:
+        client: KiteConnect instance (defaults to the module client)
+    
+    Returns:
+        tuple: (nifty_data, bank_nifty_data) quote dictionaries ({} if missing)
+    """
+    quotes = get_quotes(INDEX_QUOTE_KEYS, client)
+    return quotes.get("NSE:NIFTY 50", {}), quotes.get("NSE:NIFTY BANK", {})
+
 
 # ============================================================================
 # Trend Detection Functions
 # ============================================================================
 
+@lru_cache(maxsize=None)
+def _centered_positions(n):
+    """Sample positions 0..n-1 shifted to mean zero (read-only, cached per window length)"""
+    x = np.arange(n, dtype=float)
+    x -= (n - 1) / 2
+    x.flags.writeable = False
+    return x
+
 def get_trend(prices_deque):
     """
     Calculate trend based on linear regression of price history.
@@ -129,12 +267,14 @@ def get_trend(prices_deque):
     if len(prices_deque) < 10:
         return "NO_TREND"
     
-    # Convert deque to numpy array
-    y = np.array(list(prices_deque))
-    x = np.arange(len(prices_deque))
+    # Convert deque to numpy array (no intermediate list)
+    n = len(prices_deque)
+    y = np.fromiter(prices_deque, dtype=float, count=n)
     
-    # Calculate linear regression slope
-    slope = np.polyfit(x, y, 1)[0]
+    # Least-squares slope in closed form: sum(xc * (y - y0)) / sum(xc ** 2) with
+    # centered positions xc. Only the sign is used and the denominator is positive,
+    # so the numerator alone decides; shifting by y0 keeps a flat series exactly 0
+    slope = np.dot(_centered_positions(n), y - y[0])
     
     # Determine trend based on slope
     if slope > 0:
@@ -145,6 +285,98 @@ def get_trend(prices_deque):
         return "SIDEWAYS"
 
 
+# ============================================================================
+# Instrument Lookup
+# ============================================================================
+
+# The instrument dumps change once per trading day; keep each exchange's list
+# for INSTRUMENTS_CACHE_TTL seconds instead of downloading it on every lookup
+INSTRUMENTS_CACHE_TTL = 6 * 3600
+_instruments_cache = {}  # {exchange: InstrumentsEntry}
+_instruments_cache_lock = threading.Lock()
+
+# One downloaded instrument list plus the lookup indexes built from it:
+# symbol_to_token {tradingsymbol: instrument_token} and
+# options {(name, instrument_type, strike): [instrument, ...] by nearest expiry first}
+InstrumentsEntry = namedtuple('InstrumentsEntry', 'expires_at instruments symbol_to_token options')
+
+def _get_instruments_entry(exchange):
+    """
+    Get the cached InstrumentsEntry for an exchange.
+    
+    Only one thread downloads a missing or expired list; others wait for it.
+    Lookup indexes are built once per download. Errors from kite.instruments()
+    are raised to the caller and nothing is cached.
+    """
+    entry = _instruments_cache.get(exchange)
+    if entry and entry.expires_at > time.monotonic():
+        return entry
+    
+    with _instruments_cache_lock:
+        # Another thread may have refreshed it while we waited for the lock
+        entry = _instruments_cache.get(exchange)
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+        
+        instruments = kite.instruments(exchange)
+        symbol_to_token = {}
+        options = {}
+        for inst in instruments:
+            symbol_to_token[inst['tradingsymbol']] = inst['instrument_token']
+            if inst.get('instrument_type') in ('CE', 'PE'):
+                key = (inst['name'], inst['instrument_type'], inst['strike'])
+                options.setdefault(key, []).append(inst)
+        
+        # Sort each bucket once here so lookups take the nearest expiry as [0]
+        for contracts in options.values():
+            contracts.sort(key=lambda inst: inst['expiry'])
+        
+        entry = InstrumentsEntry(time.monotonic() + INSTRUMENTS_CACHE_TTL, instruments,
+                                 symbol_to_token, options)
+        _instruments_cache[exchange] = entry
+        return entry
+
+def _get_instruments(exchange):
+    """
+    Get the instrument list for an exchange, served from a cache.
+    
+    Args:
+        exchange: Exchange (e.g., "NSE", "NFO")
+    
+    Returns:
+        list: Instrument dictionaries as returned by kite.instruments()
+    """
+    return _get_instruments_entry(exchange).instruments
+
+def _get_symbol_index(exchange):
+    """
+    Get the tradingsymbol -> instrument_token mapping for an exchange.
+    
+    Args:
+        exchange: Exchange (e.g., "NSE", "NFO")
+    
+    Returns:
+        dict: {tradingsymbol: instrument_token}, shared and read-only
+    """
+    return _get_instruments_entry(exchange).symbol_to_token
+
+def _get_option_contracts(exchange, name, instrument_type, strike):
+    """
+    Get all option contracts of one underlying, type and strike on an exchange.
+    
+    Args:
+        exchange: Exchange (e.g., "NFO")
+        name: Underlying name (e.g., "NIFTY", "BANKNIFTY")
+        instrument_type: "CE" or "PE"
+        strike: Strike price
+    
+    Returns:
+        list: Instrument dictionaries sorted by expiry, nearest first
+              (shared, do not modify); empty if none
+    """
+    return _get_instruments_entry(exchange).options.get((name, instrument_type, strike), [])
+
+
 # ============================================================================
 # Trading Entry Functions with Target and Stop Loss
 # ============================================================================
@@ -176,19 +408,13 @@ def subscribe_option_to_websocket(tradingsymbol, exchange="NFO"):
             print(f"Already subscribed to {tradingsymbol}")
             return True
         
-        # Get instrument token for the option
-        instruments = kite.instruments(exchange)
-        option_instrument = next(
-            (inst for inst in instruments if inst.get('tradingsymbol') == tradingsymbol),
-            None
-        )
+        # Get instrument token for the option (hash lookup, no scan)
+        option_token = _get_symbol_index(exchange).get(tradingsymbol)
         
-        if not option_instrument:
+        if option_token is None:
             print(f"⚠️  Option {tradingsymbol} not found in instruments")
             return False
         
-        option_token = option_instrument['instrument_token']
-        
         # Store mappings
         option_symbol_to_token[tradingsymbol] = option_token
         option_token_to_symbol[option_token] = {
@@ -237,10 +463,10 @@ def save_paper_trade_entry(instrument, option_type, tradingsymbol, exchange, qua
         str: Trade UUID or None if failed
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        trade_uuid = str(uuid.uuid4())
+        trade_uuid = token_hex(16)
         current_time = datetime.now().isoformat()
         
         # Map instrument names
@@ -263,6 +489,15 @@ def save_paper_trade_entry(instrument, option_type, tradingsymbol, exchange, qua
         conn.commit()
         conn.close()
         
+        # Make the trade visible to the monitoring thread without a re-query
+        _add_open_paper_trade(OpenPaperTrade(
+            trade_uuid, tradingsymbol, exchange, f"{exchange}:{tradingsymbol}",
+            quantity, entry_price, target_price, stoploss_price
+        ), user_id)
+        
+        # Cached levels carry has_trade flags that this trade may have changed
+        invalidate_levels_cache(user_id)
+        
         # Subscribe to option in WebSocket for real-time price updates
         subscribe_option_to_websocket(tradingsymbol, exchange)
         
@@ -299,10 +534,10 @@ def save_trade_entry(instrument, option_type, tradingsymbol, exchange, quantity,
         str: Trade UUID or None if failed
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        trade_uuid = str(uuid.uuid4())
+        trade_uuid = token_hex(16)
         current_time = datetime.now().isoformat()
         
         # Map instrument names
@@ -333,54 +568,105 @@ def save_trade_entry(instrument, option_type, tradingsymbol, exchange, quantity,
         return None
 
 
-def update_trade_exit(trade_uuid, exit_price, exit_reason, user_id='default_user'):
+# UPDATE ... RETURNING is available from SQLite 3.35
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Trade-closing statements, built once per trade table
+# Key: table name, Value: {'close_returning', 'select_entry', 'close'} SQL strings
+_CLOSE_TRADE_SQL = {
+    table: {
+        # Single statement: P&L is computed from the stored entry price
+        'close_returning': f'''
+            UPDATE {table}
+            SET exit_price = ?, exit_time = ?, exit_reason = ?,
+                profit_loss = (? - entry_price) * quantity,
+                profit_loss_percent = (? - entry_price) * 100.0 / entry_price,
+                status = 'CLOSED', updated_at = ?
+            WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
+            RETURNING profit_loss, profit_loss_percent
+        ''',
+        'select_entry': f'''
+            SELECT entry_price, quantity FROM {table}
+            WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
+        ''',
+        'close': f'''
+            UPDATE {table}
+            SET exit_price = ?, exit_time = ?, exit_reason = ?,
+                profit_loss = ?, profit_loss_percent = ?, status = 'CLOSED', updated_at = ?
+            WHERE trade_uuid = ? AND user_id = ?
+        '''
+    }
+    for table in ('trades', 'paper_trades')
+}
+
+
+def _close_trade_row(table, trade_uuid, exit_price, exit_reason, user_id):
     """
-    Update trade exit information when trade is closed.
+    Mark an OPEN trade row as CLOSED and compute its profit/loss.
     
     Args:
+        table: 'trades' or 'paper_trades'
         trade_uuid: Trade UUID
         exit_price: Option premium at exit
         exit_reason: 'TARGET', 'STOPLOSS', or 'MANUAL'
         user_id: User ID
     
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (profit_loss, profit_loss_percent), or None if no open trade matched
     """
+    conn = get_db_connection()
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
         cursor = conn.cursor()
-        
-        # Get trade entry details
-        cursor.execute('''
-            SELECT entry_price, quantity FROM trades 
-            WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
-        ''', (trade_uuid, user_id))
-        
-        trade = cursor.fetchone()
-        if not trade:
-            print(f"Trade {trade_uuid} not found or already closed")
-            conn.close()
-            return False
-        
-        entry_price, quantity = trade
-        
-        # Calculate profit/loss
-        profit_loss = (exit_price - entry_price) * quantity
-        profit_loss_percent = ((exit_price - entry_price) / entry_price) * 100
-        
         current_time = datetime.now().isoformat()
         
-        # Update trade
-        cursor.execute('''
-            UPDATE trades 
-            SET exit_price = ?, exit_time = ?, exit_reason = ?,
-                profit_loss = ?, profit_loss_percent = ?, status = 'CLOSED', updated_at = ?
-            WHERE trade_uuid = ? AND user_id = ?
-        ''', (exit_price, current_time, exit_reason, profit_loss, profit_loss_percent, 
-              current_time, trade_uuid, user_id))
+        sql = _CLOSE_TRADE_SQL[table]
+        
+        if SQLITE_HAS_RETURNING:
+            cursor.execute(sql['close_returning'],
+                           (exit_price, current_time, exit_reason, exit_price, exit_price,
+                            current_time, trade_uuid, user_id))
+            result = cursor.fetchone()
+        else:
+            cursor.execute(sql['select_entry'], (trade_uuid, user_id))
+            trade = cursor.fetchone()
+            if not trade:
+                return None
+            
+            entry_price, quantity = trade
+            profit_loss = (exit_price - entry_price) * quantity
+            profit_loss_percent = ((exit_price - entry_price) / entry_price) * 100
+            
+            cursor.execute(sql['close'],
+                           (exit_price, current_time, exit_reason, profit_loss, profit_loss_percent,
+                            current_time, trade_uuid, user_id))
+            result = (profit_loss, profit_loss_percent)
         
         conn.commit()
+        return result
+    finally:
         conn.close()
+
+
+def update_trade_exit(trade_uuid, exit_price, exit_reason, user_id='default_user'):
+    """
+    Update trade exit information when trade is closed.
+    
+    Args:
+        trade_uuid: Trade UUID
+        exit_price: Option premium at exit
+        exit_reason: 'TARGET', 'STOPLOSS', or 'MANUAL'
+        user_id: User ID
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        closed = _close_trade_row('trades', trade_uuid, exit_price, exit_reason, user_id)
+        if closed is None:
+            print(f"Trade {trade_uuid} not found or already closed")
+            return False
+        
+        profit_loss, profit_loss_percent = closed
         
         result = "PROFIT" if profit_loss > 0 else "LOSS"
         print(f"✅ Trade exit updated: {trade_uuid} - {result} of {abs(profit_loss):.2f} ({profit_loss_percent:.2f}%)")
@@ -391,6 +677,67 @@ def update_trade_exit(trade_uuid, exit_price, exit_reason, user_id='default_user
         return False
 
 
+def _iter_rows(cursor, batch_size=1000):
+    """
+    Yield rows of an executed cursor as dictionaries keyed by column name.
+    
+    Rows are pulled with fetchmany() so large result sets are never fully
+    materialized.
+    
+    Args:
+        cursor: sqlite3 cursor on which a SELECT has been executed
+        batch_size: Number of rows fetched per round
+    
+    Yields:
+        dict: One dictionary per row
+    """
+    # sqlite3.Row maps column names in C; set on the cursor only, so pooled
+    # connections keep returning plain tuples
+    cursor.row_factory = sqlite3.Row
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(row)
+
+
+def iter_trades(user_id='default_user', status=None, instrument=None):
+    """
+    Lazily yield trades from database (see get_trades for the filters).
+    
+    The connection stays open until the generator is exhausted or closed,
+    so callers can stream rows straight into a response.
+    
+    Yields:
+        dict: One trade dictionary per row
+    
+    Raises:
+        Exception: Database errors are propagated, so a stream cut short by an
+            error can be told apart from a complete one
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Optional filters are bound as NULL so every call shares one statement
+        status = status or None
+        instrument = instrument or None
+        cursor.execute('''
+            SELECT * FROM trades
+            WHERE user_id = ?
+              AND (? IS NULL OR status = ?)
+              AND (? IS NULL OR instrument = ?)
+            ORDER BY entry_time DESC
+        ''', (user_id, status, status, instrument, instrument))
+        yield from _iter_rows(cursor)
+        
+    finally:
+        if conn:
+            conn.close()
+
+
 def get_trades(user_id='default_user', status=None, instrument=None):
     """
     Get trades from database.
@@ -401,36 +748,10 @@ def get_trades(user_id='default_user', status=None, instrument=None):
         instrument: Filter by instrument ('NIFTY_50', 'NIFTY_BANK') or None for all
     
     Returns:
-        list: List of trade dictionaries
+        list: List of trade dictionaries (empty on error)
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        query = 'SELECT * FROM trades WHERE user_id = ?'
-        params = [user_id]
-        
-        if status:
-            query += ' AND status = ?'
-            params.append(status)
-        
-        if instrument:
-            query += ' AND instrument = ?'
-            params.append(instrument)
-        
-        query += ' ORDER BY entry_time DESC'
-        
-        cursor.execute(query, params)
-        columns = [desc[0] for desc in cursor.description]
-        trades = []
-        
-        for row in cursor.fetchall():
-            trade_dict = dict(zip(columns, row))
-            trades.append(trade_dict)
-        
-        conn.close()
-        return trades
-        
+        return list(iter_trades(user_id=user_id, status=status, instrument=instrument))
     except Exception as e:
         print(f"Error getting trades: {e}")
         return []
@@ -462,9 +783,17 @@ def check_and_update_trades_from_orders(kite, user_id='default_user'):
         # Get recent orders
         try:
             orders = kite.orders()
-        except:
+        except Exception as e:
+            print(f"Error fetching orders: {e}")
             return 0
         
+        # Index completed SELL orders by tradingsymbol once, so each trade only
+        # looks at its own orders instead of rescanning the whole order book
+        sell_orders_by_symbol = {}
+        for o in orders:
+            if o.get('transaction_type') == 'SELL' and o.get('status') == 'COMPLETE':
+                sell_orders_by_symbol.setdefault(o.get('tradingsymbol'), []).append(o)
+        
         for trade in open_trades:
             trade_uuid = trade['trade_uuid']
             target_gtt_id = trade.get('target_gtt_id')
@@ -474,11 +803,8 @@ def check_and_update_trades_from_orders(kite, user_id='default_user'):
             # Check if any exit order was placed (GTT triggered)
             # Look for SELL orders for this tradingsymbol
             exit_orders = [
-                o for o in orders
-                if o.get('tradingsymbol') == tradingsymbol
-                and o.get('transaction_type') == 'SELL'
-                and o.get('status') == 'COMPLETE'
-                and o.get('order_timestamp', '') >= trade['entry_time']
+                o for o in sell_orders_by_symbol.get(tradingsymbol, ())
+                if o.get('order_timestamp', '') >= trade['entry_time']
             ]
             
             if exit_orders:
@@ -559,8 +885,10 @@ def place_option_with_tp_sl(kite, exchange, tradingsymbol, quantity, transaction
     # 2) Wait & check order execution before placing GTTs
     for _ in range(30):  # try for ~30 seconds
         try:
-            orders = kite.orders()
-            my_order = next((o for o in orders if o.get("order_id") == order_id), None)
+            # order_history() returns only this order's state transitions (latest
+            # last) instead of the whole day's order book
+            history = kite.order_history(order_id)
+            my_order = history[-1] if history else None
             if my_order and my_order.get("status") in ("COMPLETE", "OPEN", "TRIGGER PENDING"):
                 print(f"Order status: {my_order.get('status')}")
                 break
@@ -694,24 +1022,15 @@ def get_option_tradingsymbol(kite, instrument, entry_price, option_type="CE"):
         # Calculate ATM strike (round to nearest strike interval)
         atm_strike = round(entry_price / strike_interval) * strike_interval
         
-        # Get all NFO instruments
-        instruments = kite.instruments("NFO")
-        
-        # Filter for the underlying and option type
-        filtered = [
-            inst for inst in instruments
-            if inst["name"] == underlying
-            and inst["instrument_type"] == option_type
-            and inst["strike"] == atm_strike
-        ]
+        # Contracts for the underlying, option type and strike (indexed, no NFO scan)
+        contracts = _get_option_contracts("NFO", underlying, option_type, atm_strike)
         
-        if not filtered:
+        if not contracts:
             print(f"No {option_type} options found for {underlying} at strike {atm_strike}")
             return None
         
-        # Get the nearest expiry (sort by expiry date, take the first)
-        filtered.sort(key=lambda x: x["expiry"])
-        nearest_option = filtered[0]
+        # Get the nearest expiry (contracts are presorted by expiry date)
+        nearest_option = contracts[0]
         
         tradingsymbol = nearest_option["tradingsymbol"]
         print(f"Found ATM {option_type} option: {tradingsymbol} (Strike: {atm_strike}, Expiry: {nearest_option['expiry']})")
@@ -868,7 +1187,6 @@ def place_call_order(price, instrument="NIFTY 50"):
         
     except Exception as e:
         print(f"❌ Error placing CALL order for {instrument}: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -1008,12 +1326,45 @@ def place_put_order(price, instrument="NIFTY 50"):
         
     except Exception as e:
         print(f"❌ Error placing PUT order for {instrument}: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
 
-def check_trend_reversal(instrument_name, cache_key, prices_deque):
+# Worker threads for level-triggered orders, keeping broker calls off the monitor thread
+order_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='level-order')
+
+# Levels whose order is still being placed on order_executor (skipped by the monitor)
+pending_level_orders = set()
+
+def _place_level_order(place_order, side, instrument_name, level_uuid, level_value, current_price):
+    """
+    Place a level-triggered order (runs on order_executor).
+    
+    Args:
+        place_order: place_call_order or place_put_order
+        side: "CALL" or "PUT" (for logging)
+        instrument_name: Display name ("NIFTY 50" or "NIFTY BANK")
+        level_uuid: UUID of the level whose order flag was set
+        level_value: Level value (for logging)
+        current_price: Underlying price at trigger
+    """
+    try:
+        order_success = place_order(current_price, instrument_name)
+    except Exception as e:
+        print(f"Error placing {side} order: {e}")
+        order_success = False
+    
+    if order_success:
+        print(f"✅ {side} ORDER PLACED: {instrument_name} at level {level_value:.2f} (current: {current_price:.2f})")
+    else:
+        # Order failed - reset flag to allow retry
+        print(f"⚠️  {side} ORDER FAILED: {instrument_name} at level {level_value:.2f} - resetting flag for retry")
+        order_placed_at_level[level_uuid] = False
+    
+    pending_level_orders.discard(level_uuid)
+
+
+def check_trend_reversal(instrument_name, cache_key, prices_deque, levels_data=None):
     """
     Check if price touches any stored level and place reversal order based on approach direction.
     This function is called by the background monitoring thread.
@@ -1026,6 +1377,8 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
         instrument_name: Display name ("NIFTY 50" or "NIFTY BANK")
         cache_key: Cache key ("NIFTY_50" or "NIFTY_BANK")
         prices_deque: The price deque for this instrument
+        levels_data: Optional get_levels() result shared across instruments;
+                     read from the database when not provided
     """
     global previous_trends, order_placed_at_level, previous_price_position_by_level, last_order_time
     
@@ -1034,27 +1387,42 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
         return
     
     # Get all levels for this instrument from database
-    user_id = 'default_user'
-    levels_data = get_levels(user_id, index_type=cache_key, today_only=False)
+    if levels_data is None:
+        user_id = 'default_user'
+        try:
+            levels_data = get_levels(user_id, index_type=cache_key, today_only=False)
+        except Exception as e:
+            print(f"Error getting levels: {e}")
+            return
     levels = levels_data.get(cache_key, [])
     
     # Skip if no levels are set
     if not levels or len(levels) == 0:
         return
     
-    # Get current price (last price in deque)
-    current_price = list(prices_deque)[-1]
+    # Get current price (last price in deque; indexed directly, no list copy)
+    current_price = prices_deque[-1]
     
     # Check each level to see if price touches it
     for level in levels:
         level_uuid = level['uuid']
         level_value = level['value']
         
+        # Skip this level while its order is still being placed
+        if level_uuid in pending_level_orders:
+            continue
+        
+        # Whether a paper trade exists for this level comes with the cached levels;
+        # query it only for levels read without the flag
+        has_trade = level.get('has_trade')
+        if has_trade is None:
+            has_trade = check_paper_trade_exists_for_level(level_value, cache_key)
+        
         # Skip this level if an order was already placed for it
         # Check both in-memory flag and database to handle server restarts
         if order_placed_at_level.get(level_uuid, False):
             # Verify trade exists in database
-            if check_paper_trade_exists_for_level(level_value, cache_key):
+            if has_trade:
                 continue  # Don't monitor this level anymore - trade exists
             else:
                 # Flag is set but no trade exists - reset flag and continue monitoring
@@ -1062,7 +1430,7 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
                 order_placed_at_level[level_uuid] = False
         else:
             # Flag not set, but check database anyway (in case of server restart)
-            if check_paper_trade_exists_for_level(level_value, cache_key):
+            if has_trade:
                 # Trade exists in DB but flag not set - set the flag
                 order_placed_at_level[level_uuid] = True
                 print(f"ℹ️  {instrument_name} Level {level_value:.2f}: Found existing trade in DB, setting flag")
@@ -1091,17 +1459,13 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
             previous_price_position_by_level[level_uuid] = current_position
         
         # Debug logging (only log occasionally to avoid spam)
-        if not hasattr(check_trend_reversal, '_log_count'):
-            check_trend_reversal._log_count = {}
-        log_key = f"{cache_key}_{level_uuid}"
-        if log_key not in check_trend_reversal._log_count:
-            check_trend_reversal._log_count[log_key] = 0
-        check_trend_reversal._log_count[log_key] += 1
+        log_count = level_check_counts.get(level_uuid, 0) + 1
+        level_check_counts[level_uuid] = log_count
         
         # Log every 10th check or when near level (within 0.5%)
-        should_log = (check_trend_reversal._log_count[log_key] % 10 == 0) or (price_diff_percent <= 0.5)
-        if should_log:
-            print(f"📊 {instrument_name} Level {level_value:.2f}: Current={current_price:.2f}, Diff={price_diff:.2f} ({price_diff_percent:.3f}%), Position={current_position}, Prev={previous_position}, OrderPlaced={order_placed_at_level.get(level_uuid, False)}")
+        should_log = (log_count % 10 == 0) or (price_diff_percent <= 0.5)
+        if should_log and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"📊 {instrument_name} Level {level_value:.2f}: Current={current_price:.2f}, Diff={price_diff:.2f} ({price_diff_percent:.3f}%), Position={current_position}, Prev={previous_position}, OrderPlaced={order_placed_at_level.get(level_uuid, False)}")
         
         # Check if price just touched this level (transitioned from above/below to at level)
         price_touched_level = False
@@ -1113,8 +1477,7 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
                 # Edge case: price was already at level when we started monitoring
                 # Check if we have enough price history to determine direction
                 if len(prices_deque) >= 2:
-                    price_list = list(prices_deque)
-                    prev_price = price_list[-2]
+                    prev_price = prices_deque[-2]
                     if prev_price > level_value:
                         previous_position = 'above'
                         price_touched_level = True
@@ -1130,7 +1493,7 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
             if can_place_order:
                 last_order_ts = last_order_time.get(cache_key)
                 if last_order_ts is not None:
-                    time_since_last_order = (datetime.now() - datetime.fromisoformat(last_order_ts)).total_seconds()
+                    time_since_last_order = time.monotonic() - last_order_ts
                     if time_since_last_order < 60:  # 60 seconds cooldown per instrument
                         can_place_order = False
                         if should_log:
@@ -1140,29 +1503,24 @@ def check_trend_reversal(instrument_name, cache_key, prices_deque):
                 # Set flag IMMEDIATELY to prevent race conditions (multiple simultaneous orders)
                 # This ensures only one order is placed even if function takes time
                 order_placed_at_level[level_uuid] = True
-                last_order_time[cache_key] = datetime.now().isoformat()
+                last_order_time[cache_key] = time.monotonic()
+                
+                # Orders are placed on the order executor so the monitor keeps checking
+                # levels while the broker round trips (and fill wait) run
+                if previous_position in ('above', 'below'):
+                    pending_level_orders.add(level_uuid)
                 
                 # Price came from UP (above) and touched level → Buy CALL (reversal up expected)
                 if previous_position == 'above':
                     print(f"🔼 TRIGGER: {instrument_name} price touched level {level_value:.2f} from UP - executing CALL order at {current_price:.2f}")
-                    order_success = place_call_order(current_price, instrument_name)
-                    if order_success:
-                        print(f"✅ CALL ORDER PLACED: {instrument_name} at level {level_value:.2f} (current: {current_price:.2f})")
-                    else:
-                        # Order failed - reset flag to allow retry
-                        print(f"⚠️  CALL ORDER FAILED: {instrument_name} at level {level_value:.2f} - resetting flag for retry")
-                        order_placed_at_level[level_uuid] = False
+                    order_executor.submit(_place_level_order, place_call_order, 'CALL',
+                                          instrument_name, level_uuid, level_value, current_price)
                 
                 # Price came from DOWN (below) and touched level → Buy PUT (reversal down expected)
                 elif previous_position == 'below':
                     print(f"🔽 TRIGGER: {instrument_name} price touched level {level_value:.2f} from DOWN - executing PUT order at {current_price:.2f}")
-                    order_success = place_put_order(current_price, instrument_name)
-                    if order_success:
-                        print(f"✅ PUT ORDER PLACED: {instrument_name} at level {level_value:.2f} (current: {current_price:.2f})")
-                    else:
-                        # Order failed - reset flag to allow retry
-                        print(f"⚠️  PUT ORDER FAILED: {instrument_name} at level {level_value:.2f} - resetting flag for retry")
-                        order_placed_at_level[level_uuid] = False
+                    order_executor.submit(_place_level_order, place_put_order, 'PUT',
+                                          instrument_name, level_uuid, level_value, current_price)
             else:
                 if should_log:
                     if order_placed_at_level.get(level_uuid, False):
@@ -1212,18 +1570,102 @@ def on_tick(price, instrument="NIFTY 50", entry_price=None):
     
     # Append price to deque (trend reversal checking happens in background thread)
     prices_deque.append(price)
+    trend_price_event.set()
 
 
 # ============================================================================
 # Database Functions
 # ============================================================================
 
+# Number of idle SQLite connections kept open for reuse
+DB_POOL_SIZE = 5
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+DB_CACHED_STATEMENTS = 256
+
+# Per-connection memory-mapped I/O limit (bytes) and page cache size (KiB)
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_CACHE_SIZE_KB = 64000
+
+# LIFO so the most recently returned connection (warm page cache and prepared
+# statements) is handed out first; surplus idle connections stay at the bottom
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+
+class _PooledConnection:
+    """sqlite3.Connection proxy whose close() hands the connection back to the pool"""
+    
+    # One proxy is allocated per get_db_connection() call; no per-instance __dict__
+    __slots__ = ('_conn',)
+    
+    def __init__(self, conn):
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # Drop anything the caller did not commit before the next checkout
+            conn.rollback()
+            _db_pool.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+
+def get_db_connection():
+    """
+    Get a connection to the application database.
+    
+    Connections are reused from a small pool instead of opening the database
+    file (and re-reading the schema) on every call. Callers use the returned
+    connection like a normal sqlite3 connection; close() returns it to the
+    pool. A connection that is never closed is simply not reused.
+    
+    Returns:
+        Connection proxy; the caller closes it
+    """
+    try:
+        conn = _db_pool.get_nowait()
+    except queue.Empty:
+        # Pooled connections move between request and monitoring threads,
+        # but each one is only used by a single caller at a time
+        conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False,
+                               cached_statements=DB_CACHED_STATEMENTS)
+        # Safe with WAL (set once in init_database): commits no longer fsync the
+        # database file, only the WAL at checkpoints
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # Read pages through a memory map instead of copying them into the page
+        # cache; both limits are upper bounds, memory is only used as the file grows
+        conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    return _PooledConnection(conn)
+
+
+def close_db_pool():
+    """Close all idle pooled connections (registered to run at exit)"""
+    while True:
+        try:
+            _db_pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
+atexit.register(close_db_pool)
+
 def init_database():
     """Initialize the SQLite database and create tables"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
+        # WAL lets readers (API requests) proceed while the monitoring threads
+        # write; the journal mode is persistent, so it only needs to be set once
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create alerts table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS alerts (
@@ -1253,16 +1695,14 @@ def init_database():
             )
         ''')
         
-        # Add new columns if they don't exist (for existing databases)
-        try:
+        # Add new columns if they don't exist (for existing databases); check the
+        # schema first instead of letting ALTER TABLE fail on every startup
+        cursor.execute('PRAGMA table_info(alerts)')
+        alert_columns = {col[1] for col in cursor.fetchall()}
+        if 'last_triggered_at' not in alert_columns:
             cursor.execute('ALTER TABLE alerts ADD COLUMN last_triggered_at TEXT')
-        except:
-            pass  # Column already exists
-        
-        try:
+        if 'last_triggered_price' not in alert_columns:
             cursor.execute('ALTER TABLE alerts ADD COLUMN last_triggered_price REAL')
-        except:
-            pass  # Column already exists
         
         # Create level table
         cursor.execute('''
@@ -1391,7 +1831,38 @@ def init_database():
         except Exception as e:
             print(f"Migration check completed (or not needed): {e}")
         
+        # Indexes for the hot lookups (created after the level migration, which
+        # may rebuild the level table)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_level_user_index_value
+            ON level(user_id, index_type, level_value DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_level_user_date
+            ON level(user_id, created_date)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_trades_user_entry_time
+            ON trades(user_id, entry_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_paper_trades_user_entry_time
+            ON paper_trades(user_id, entry_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_paper_trades_user_instrument
+            ON paper_trades(user_id, instrument, underlying_entry_price)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_alerts_status_count
+            ON alerts(status, alert_count)
+        ''')
+        
         conn.commit()
+        
+        # Refresh planner statistics when they are missing or out of date
+        cursor.execute('PRAGMA optimize')
+        
         conn.close()
         print("Database initialized successfully")
         
@@ -1404,126 +1875,257 @@ def init_database():
     except Exception as e:
         print(f"Error initializing database: {e}")
 
+# Level table statements (static strings so pooled connections reuse the
+# prepared statements from their cache)
+_SQL_INSERT_LEVEL = '''
+    INSERT INTO level 
+    (uuid, user_id, index_type, level_value, created_at, updated_at, created_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_UPDATE_LEVEL_VALUE = '''
+    UPDATE level 
+    SET level_value = ?, updated_at = ?
+    WHERE uuid = ? AND user_id = ?
+'''
+
+# Optional index_type / created_date filters are bound as NULL
+_SQL_SELECT_LEVELS = '''
+    SELECT uuid, index_type, level_value, updated_at, created_date
+    FROM level 
+    WHERE user_id = ?
+      AND (? IS NULL OR index_type = ?)
+      AND (? IS NULL OR created_date = ?)
+    ORDER BY index_type, level_value DESC
+'''
+
 def save_level(user_id, index_type, level_value, level_uuid=None):
     """Save a level to the database (allows dynamic levels, not just 1-3)"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        current_time = datetime.now().isoformat()
-        current_date = datetime.now().date().isoformat()  # Date for daily refresh
+        now = datetime.now()
+        current_time = now.isoformat()
+        current_date = now.date().isoformat()  # Date for daily refresh
         
         # If UUID provided, update existing level; otherwise create new one
         if level_uuid:
-            cursor.execute('''
-                SELECT uuid FROM level 
-                WHERE uuid = ? AND user_id = ?
-            ''', (level_uuid, user_id))
+            # Update existing level; rowcount tells whether the UUID exists
+            cursor.execute(_SQL_UPDATE_LEVEL_VALUE, (level_value, current_time, level_uuid, user_id))
             
-            if cursor.fetchone():
-                # Update existing level
-                cursor.execute('''
-                    UPDATE level 
-                    SET level_value = ?, updated_at = ?
-                    WHERE uuid = ? AND user_id = ?
-                ''', (level_value, current_time, level_uuid, user_id))
-            else:
+            if cursor.rowcount == 0:
+                conn.close()
                 return False  # UUID not found
         else:
             # Create new level
-            level_uuid = str(uuid.uuid4())
-            cursor.execute('''
-                INSERT INTO level 
-                (uuid, user_id, index_type, level_value, created_at, updated_at, created_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (level_uuid, user_id, index_type, level_value, current_time, current_time, current_date))
+            level_uuid = token_hex(16)
+            cursor.execute(_SQL_INSERT_LEVEL,
+                           (level_uuid, user_id, index_type, level_value, current_time, current_time, current_date))
         
         conn.commit()
         conn.close()
+        invalidate_levels_cache(user_id)
         print(f"Level saved with UUID: {level_uuid}")
         return level_uuid
     except Exception as e:
         print(f"Error saving level: {e}")
         return None
 
-def get_levels(user_id, index_type=None, today_only=False):
-    """Get all levels for a user (returns as list, not fixed 1-3 structure)
+def iter_levels(user_id, index_type=None, today_only=False):
+    """Lazily yield levels for a user, ordered by index type then value (descending)
+    
+    The connection stays open until the generator is exhausted or closed,
+    so callers can stream rows straight into a response.
     
     Args:
         user_id: User ID
         index_type: Optional filter by index type ('BANK_NIFTY' or 'NIFTY_50')
         today_only: If True, only return levels created today
+    
+    Yields:
+        tuple: (index_type, level dictionary)
+    
+    Raises:
+        Exception: Database errors are propagated so callers can tell a failed
+            read from a user without levels
     """
+    conn = None
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        today = datetime.now().date().isoformat()
-        
-        if index_type:
-            if today_only:
-                cursor.execute('''
-                    SELECT uuid, index_type, level_value, updated_at, created_date
-                    FROM level 
-                    WHERE user_id = ? AND index_type = ? AND created_date = ?
-                    ORDER BY level_value DESC
-                ''', (user_id, index_type, today))
-            else:
-                cursor.execute('''
-                    SELECT uuid, index_type, level_value, updated_at, created_date
-                    FROM level 
-                    WHERE user_id = ? AND index_type = ?
-                    ORDER BY level_value DESC
-                ''', (user_id, index_type))
-        else:
-            if today_only:
-                cursor.execute('''
-                    SELECT uuid, index_type, level_value, updated_at, created_date
-                    FROM level 
-                    WHERE user_id = ? AND created_date = ?
-                    ORDER BY index_type, level_value DESC
-                ''', (user_id, today))
-            else:
-                cursor.execute('''
-                    SELECT uuid, index_type, level_value, updated_at, created_date
-                    FROM level 
-                    WHERE user_id = ?
-                    ORDER BY index_type, level_value DESC
-                ''', (user_id,))
+        index_type = index_type or None
+        today = date.today().isoformat() if today_only else None
         
-        results = cursor.fetchall()
-        conn.close()
+        # One statement for every filter combination
+        cursor.execute(_SQL_SELECT_LEVELS, (user_id, index_type, index_type, today, today))
         
-        # Convert to dictionary format with lists instead of fixed 1-3 structure
-        levels = {
-            'BANK_NIFTY': [],
-            'NIFTY_50': []
-        }
-        
-        for row in results:
-            level_uuid, idx_type, level_value, updated_at, created_date = row
-            levels[idx_type].append({
+        # Rows come straight from the cursor (no intermediate fetchall() list)
+        for level_uuid, idx_type, level_value, updated_at, created_date in cursor:
+            yield idx_type, {
                 'uuid': level_uuid,
                 'value': level_value,
                 'updated_at': updated_at,
                 'created_date': created_date
+            }
+    finally:
+        if conn:
+            conn.close()
+
+def get_levels(user_id, index_type=None, today_only=False):
+    """Get all levels for a user (returns as list, not fixed 1-3 structure)
+    
+    Args:
+        user_id: User ID
+        index_type: Optional filter by index type ('BANK_NIFTY' or 'NIFTY_50')
+        today_only: If True, only return levels created today
+    
+    Raises:
+        Exception: If the levels could not be read (see iter_levels)
+    """
+    # Convert to dictionary format with lists instead of fixed 1-3 structure
+    levels = {
+        'BANK_NIFTY': [],
+        'NIFTY_50': []
+    }
+    
+    for idx_type, level in iter_levels(user_id, index_type, today_only):
+        levels.setdefault(idx_type, []).append(level)
+    
+    return levels
+
+# Levels read by the monitoring threads, cached per user for LEVELS_CACHE_TTL
+# seconds; every level write invalidates the cache so new levels apply at once
+LEVELS_CACHE_TTL = 30
+_levels_cache = {}  # {user_id: (expires_at, levels)}
+_levels_cache_lock = threading.Lock()
+_levels_cache_generation = 0  # Bumped on invalidation so in-flight reads are not cached
+
+# Levels plus whether a paper trade was already placed at each one (same match
+# as check_paper_trade_exists_for_level), so the monitor needs no per-level query
+_SQL_SELECT_LEVELS_WITH_TRADE_FLAG = '''
+    SELECT l.uuid, l.index_type, l.level_value, l.updated_at, l.created_date,
+           EXISTS (
+               SELECT 1 FROM paper_trades p
+               WHERE p.user_id = l.user_id
+                 AND p.instrument = l.index_type
+                 AND p.underlying_entry_price BETWEEN l.level_value - l.level_value * ?
+                                                  AND l.level_value + l.level_value * ?
+           ) AS has_trade
+    FROM level l
+    WHERE l.user_id = ?
+    ORDER BY l.index_type, l.level_value DESC
+'''
+
+def get_levels_with_trade_flags(user_id):
+    """Get all levels for a user (see get_levels), each with a 'has_trade' flag
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        dict: {index_type: [level dictionary, ...]}, or None if the query failed
+    """
+    levels = {
+        'BANK_NIFTY': [],
+        'NIFTY_50': []
+    }
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(_SQL_SELECT_LEVELS_WITH_TRADE_FLAG,
+                       (PAPER_TRADE_LEVEL_TOLERANCE, PAPER_TRADE_LEVEL_TOLERANCE, user_id))
+        
+        for level_uuid, idx_type, level_value, updated_at, created_date, has_trade in cursor:
+            levels.setdefault(idx_type, []).append({
+                'uuid': level_uuid,
+                'value': level_value,
+                'updated_at': updated_at,
+                'created_date': created_date,
+                'has_trade': bool(has_trade)
             })
         
+        conn.close()
         return levels
     except Exception as e:
-        print(f"Error getting levels: {e}")
-        return {
-            'BANK_NIFTY': [],
-            'NIFTY_50': []
-        }
+        print(f"Error getting levels with trade flags: {e}")
+        return None
+
+def get_levels_cached(user_id='default_user'):
+    """Get all levels for a user with their 'has_trade' flags, served from a short-lived cache
+    
+    Falls back to get_levels() (no 'has_trade' key) if the joined query fails.
+    Only successful reads are cached; if both reads fail, empty level lists are
+    returned and the next call retries the database.
+    The returned dictionary is shared between callers and must not be modified.
+    """
+    now = time.monotonic()
+    entry = _levels_cache.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+    
+    generation = _levels_cache_generation
+    levels = get_levels_with_trade_flags(user_id)
+    if levels is None:
+        try:
+            levels = get_levels(user_id, today_only=False)
+        except Exception as e:
+            print(f"Error getting levels: {e}")
+            return {'BANK_NIFTY': [], 'NIFTY_50': []}
+    with _levels_cache_lock:
+        # Skip caching if a write invalidated the cache while we were reading
+        if generation == _levels_cache_generation:
+            _levels_cache[user_id] = (now + LEVELS_CACHE_TTL, levels)
+    return levels
+
+def invalidate_levels_cache(user_id=None):
+    """Drop cached levels for a user (or for every user if user_id is None)"""
+    global _levels_cache_generation
+    
+    with _levels_cache_lock:
+        _levels_cache_generation += 1
+        if user_id is None:
+            _levels_cache.clear()
+        else:
+            _levels_cache.pop(user_id, None)
+
+def get_levels_version(user_id):
+    """Get a cheap version marker for a user's levels
+    
+    Any save, update or delete changes the row count or the latest
+    updated_at, so the marker changes whenever get_levels() would.
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        str: Version marker, or None if it could not be read
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT COUNT(*), MAX(updated_at) FROM level WHERE user_id = ?
+        ''', (user_id,))
+        count, last_updated = cursor.fetchone()
+        
+        conn.close()
+        return f"{count}:{last_updated}"
+    except Exception as e:
+        print(f"Error getting levels version: {e}")
+        return None
 
 def clear_levels_for_today(user_id):
     """Clear all levels created today (for daily refresh)"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        today = datetime.now().date().isoformat()
+        today = date.today().isoformat()
         
         cursor.execute('''
             DELETE FROM level 
@@ -1533,6 +2135,7 @@ def clear_levels_for_today(user_id):
         deleted_count = cursor.rowcount
         conn.commit()
         conn.close()
+        invalidate_levels_cache(user_id)
         
         print(f"Cleared {deleted_count} levels for today")
         return deleted_count
@@ -1543,23 +2146,20 @@ def clear_levels_for_today(user_id):
 def clear_all_levels(user_id, index_type=None):
     """Clear all levels for a user (or specific index type)"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        if index_type:
-            cursor.execute('''
-                DELETE FROM level 
-                WHERE user_id = ? AND index_type = ?
-            ''', (user_id, index_type))
-        else:
-            cursor.execute('''
-                DELETE FROM level 
-                WHERE user_id = ?
-            ''', (user_id,))
+        # index_type is bound as NULL to clear every index with the same statement
+        index_type = index_type or None
+        cursor.execute('''
+            DELETE FROM level 
+            WHERE user_id = ? AND (? IS NULL OR index_type = ?)
+        ''', (user_id, index_type, index_type))
         
         deleted_count = cursor.rowcount
         conn.commit()
         conn.close()
+        invalidate_levels_cache(user_id)
         
         print(f"Cleared {deleted_count} levels")
         return deleted_count
@@ -1567,6 +2167,29 @@ def clear_all_levels(user_id, index_type=None):
         print(f"Error clearing levels: {e}")
         return 0
 
+def delete_level(level_uuid):
+    """Delete a level by UUID
+    
+    Returns:
+        int: Number of levels deleted (0 if the UUID was not found), or None on error
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Single statement; rowcount tells whether the UUID existed
+        cursor.execute('DELETE FROM level WHERE uuid = ?', (level_uuid,))
+        
+        deleted_count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        # The level's owner is not known here, so drop every user's cache
+        invalidate_levels_cache()
+        return deleted_count
+    except Exception as e:
+        print(f"Error deleting level: {e}")
+        return None
+
 def load_entry_prices_from_db(user_id='default_user'):
     """
     Load entry prices from database into cache (optimized - reads once).
@@ -1581,7 +2204,7 @@ def load_entry_prices_from_db(user_id='default_user'):
     global entry_prices_cache
     
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Fetch all entry prices for the user
@@ -1626,7 +2249,7 @@ def save_entry_price_to_db(user_id, instrument, entry_price):
     global entry_prices_cache
     
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         current_time = datetime.now().isoformat()
@@ -1662,7 +2285,7 @@ def check_levels_for_today(user_id):
 def store_alert_response(alert_data, kite_response):
     """Store alert response in database"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Extract data from KITE response - handle different response structures
@@ -1724,46 +2347,30 @@ def store_alert_response(alert_data, kite_response):
         print(f"Error storing alert in database: {e}")
         return False
 
+# Columns selected by get_stored_alerts (also the dict keys)
+_ALERT_COLUMNS = (
+    'uuid', 'name', 'user_id', 'lhs_exchange', 'lhs_tradingsymbol', 'lhs_attribute',
+    'operator', 'rhs_type', 'rhs_constant', 'rhs_exchange', 'rhs_tradingsymbol',
+    'rhs_attribute', 'type', 'status', 'alert_count', 'disabled_reason',
+    'created_at', 'updated_at', 'stored_at', 'last_triggered_at', 'last_triggered_price'
+)
+
+_SQL_SELECT_STORED_ALERTS = f'''
+    SELECT {', '.join(_ALERT_COLUMNS)}
+    FROM alerts
+    ORDER BY stored_at DESC
+'''
+
 def get_stored_alerts():
     """Retrieve all stored alerts from database"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        cursor.execute('''
-            SELECT uuid, name, user_id, lhs_exchange, lhs_tradingsymbol, lhs_attribute,
-                   operator, rhs_type, rhs_constant, rhs_exchange, rhs_tradingsymbol,
-                   rhs_attribute, type, status, alert_count, disabled_reason,
-                   created_at, updated_at, stored_at, last_triggered_at, last_triggered_price
-            FROM alerts
-            ORDER BY stored_at DESC
-        ''')
+        cursor.execute(_SQL_SELECT_STORED_ALERTS)
         
-        alerts = []
-        for row in cursor.fetchall():
-            alerts.append({
-                'uuid': row[0],
-                'name': row[1],
-                'user_id': row[2],
-                'lhs_exchange': row[3],
-                'lhs_tradingsymbol': row[4],
-                'lhs_attribute': row[5],
-                'operator': row[6],
-                'rhs_type': row[7],
-                'rhs_constant': row[8],
-                'rhs_exchange': row[9],
-                'rhs_tradingsymbol': row[10],
-                'rhs_attribute': row[11],
-                'type': row[12],
-                'status': row[13],
-                'alert_count': row[14],
-                'disabled_reason': row[15],
-                'created_at': row[16],
-                'updated_at': row[17],
-                'stored_at': row[18],
-                'last_triggered_at': row[19],
-                'last_triggered_price': row[20]
-            })
+        alerts = [dict(row) for row in cursor]
         
         conn.close()
         return alerts
@@ -1772,10 +2379,47 @@ def get_stored_alerts():
         print(f"Error retrieving alerts from database: {e}")
         return []
 
+# Columns returned for a single stored alert (in SELECT order; also the dict keys)
+_ALERT_DETAIL_COLUMNS = (
+    'uuid', 'name', 'user_id', 'lhs_exchange', 'lhs_tradingsymbol', 'lhs_attribute',
+    'operator', 'rhs_type', 'rhs_constant', 'rhs_exchange', 'rhs_tradingsymbol',
+    'rhs_attribute', 'type', 'status', 'alert_count', 'disabled_reason',
+    'created_at', 'updated_at', 'stored_at', 'kite_response'
+)
+
+_SQL_SELECT_ALERT_DETAIL = f'''
+    SELECT {', '.join(_ALERT_DETAIL_COLUMNS)}
+    FROM alerts
+    WHERE uuid = ?
+'''
+
+def get_stored_alert(uuid):
+    """Retrieve a single stored alert (with its decoded KITE response) by UUID
+    
+    Database errors are raised so callers can tell them apart from a missing alert.
+    
+    Returns:
+        dict: Alert details, or None if no alert has this UUID
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_SQL_SELECT_ALERT_DETAIL, (uuid,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    
+    if not row:
+        return None
+    
+    alert = dict(zip(_ALERT_DETAIL_COLUMNS, row))
+    alert['kite_response'] = json.loads(alert['kite_response'])
+    return alert
+
 def delete_alert_from_database(uuid):
     """Delete alert from local database"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('DELETE FROM alerts WHERE uuid = ?', (uuid,))
@@ -1798,23 +2442,49 @@ def delete_alert_from_database(uuid):
 # Session Management Functions
 # ============================================================================
 
+# Parsed session file, reused until the file's mtime or size changes
+_session_file_cache = None  # ((st_mtime_ns, st_size), data)
+_session_file_lock = threading.Lock()
+
+def _read_session_file():
+    """
+    Read and parse SESSION_FILE, reusing the last parse while the file is unchanged.
+    
+    Returns:
+        dict: Session data (shared between callers, do not modify)
+    
+    Raises:
+        OSError, ValueError: If the file cannot be read or parsed
+    """
+    global _session_file_cache
+    
+    stat = os.stat(SESSION_FILE)
+    file_key = (stat.st_mtime_ns, stat.st_size)
+    
+    with _session_file_lock:
+        if _session_file_cache and _session_file_cache[0] == file_key:
+            return _session_file_cache[1]
+        
+        with open(SESSION_FILE, 'r') as f:
+            data = json.load(f)
+        _session_file_cache = (file_key, data)
+        return data
+
 def load_session_data():
     """Load session data from file"""
     global user_api_key, user_api_secret, kite
     
     if os.path.exists(SESSION_FILE):
         try:
-            with open(SESSION_FILE, 'r') as f:
-                data = json.load(f)
-                user_api_key = data.get('api_key')
-                user_api_secret = data.get('api_secret')
-                access_token = data.get('access_token')
-                
-                if user_api_key and access_token:
-                    kite = KiteConnect(api_key=user_api_key)
-                    kite.set_access_token(access_token)
-                    print("Loaded existing session from file")
-                    return True
+            data = _read_session_file()
+            user_api_key = data.get('api_key')
+            user_api_secret = data.get('api_secret')
+            access_token = data.get('access_token')
+            
+            if user_api_key and access_token:
+                kite = create_kite_client(user_api_key, access_token)
+                print("Loaded existing session from file")
+                return True
         except Exception as e:
             print(f"Error loading session: {e}")
     return False
@@ -1823,13 +2493,12 @@ def sync_session_from_file():
     """Sync Flask session with file-based session data"""
     if os.path.exists(SESSION_FILE):
         try:
-            with open(SESSION_FILE, 'r') as f:
-                data = json.load(f)
-                session['api_key'] = data.get('api_key')
-                session['api_secret'] = data.get('api_secret')
-                session['access_token'] = data.get('access_token')
-                print("Synced session from file")
-                return True
+            data = _read_session_file()
+            session['api_key'] = data.get('api_key')
+            session['api_secret'] = data.get('api_secret')
+            session['access_token'] = data.get('access_token')
+            print("Synced session from file")
+            return True
         except Exception as e:
             print(f"Error syncing session: {e}")
     return False
@@ -1871,7 +2540,7 @@ def send_alert_to_kite(alert_data):
         }
         
         # Send POST request to KITE alerts API
-        response = requests.post(
+        response = kite_rest_session.post(
             'https://api.kite.trade/alerts',
             headers=headers,
             data=alert_data
@@ -1888,41 +2557,48 @@ def send_alert_to_kite(alert_data):
     except Exception as e:
         return {'error': f'Error sending alert to KITE: {str(e)}', 'success': False}
 
-def sync_alerts_with_zerodha():
-    """Sync local database alerts with Zerodha - remove alerts that no longer exist in Zerodha"""
+def sync_alerts_with_zerodha(zerodha_data=None):
+    """Sync local database alerts with Zerodha - remove alerts that no longer exist in Zerodha
+    
+    Args:
+        zerodha_data: Optional alerts response already fetched from Zerodha
+                      (GET /alerts JSON); fetched here when not provided
+    """
     global kite
     
-    if not session.get('access_token') or not kite:
+    if zerodha_data is None and (not session.get('access_token') or not kite):
         print("Cannot sync alerts: Not authenticated")
         return False
     
     try:
-        # Get API credentials from session
-        api_key = session.get('api_key')
-        access_token = session.get('access_token')
-        
-        # Prepare headers
-        headers = {
-            'X-Kite-Version': '3',
-            'Authorization': f'token {api_key}:{access_token}'
-        }
-        
-        # Get alerts from Zerodha
-        response = requests.get(
-            'https://api.kite.trade/alerts',
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            print(f"Failed to fetch alerts from Zerodha: {response.text}")
-            return False
+        if zerodha_data is None:
+            # Get API credentials from session
+            api_key = session.get('api_key')
+            access_token = session.get('access_token')
+            
+            # Prepare headers
+            headers = {
+                'X-Kite-Version': '3',
+                'Authorization': f'token {api_key}:{access_token}'
+            }
+            
+            # Get alerts from Zerodha
+            response = kite_rest_session.get(
+                'https://api.kite.trade/alerts',
+                headers=headers
+            )
+            
+            if response.status_code != 200:
+                print(f"Failed to fetch alerts from Zerodha: {response.text}")
+                return False
+            
+            zerodha_data = response.json()
         
-        zerodha_data = response.json()
         zerodha_alerts = zerodha_data.get('data', [])
         zerodha_uuids = {alert['uuid'] for alert in zerodha_alerts}
         
         # Get alerts from local database
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT uuid, name FROM alerts')
@@ -1934,12 +2610,14 @@ def sync_alerts_with_zerodha():
             if db_uuid not in zerodha_uuids:
                 alerts_to_delete.append((db_uuid, db_name))
         
-        # Delete orphaned alerts from database
+        # Delete orphaned alerts from database in one batch; executemany
+        # reports the total rowcount across all UUIDs
         deleted_count = 0
-        for uuid, name in alerts_to_delete:
-            cursor.execute('DELETE FROM alerts WHERE uuid = ?', (uuid,))
-            if cursor.rowcount > 0:
-                deleted_count += 1
+        if alerts_to_delete:
+            cursor.executemany('DELETE FROM alerts WHERE uuid = ?',
+                               [(uuid,) for uuid, _ in alerts_to_delete])
+            deleted_count = cursor.rowcount
+            for uuid, name in alerts_to_delete:
                 print(f"Deleted orphaned alert from database: {name} ({uuid})")
         
         if deleted_count > 0:
@@ -1990,6 +2668,9 @@ def check_price_touch_level(current_price, target_price, operator, previous_pric
     if current_price == 0 or target_price == 0:
         return {'crossed': False, 'direction': None, 'status': 'no_data', 'crossed_today': False}
     
+    # Distance from the level, shared by the crossing checks, status and response
+    distance = abs(current_price - target_price)
+    
     # Check if price has crossed the level based on operator
     crossed = False
     direction = None
@@ -2045,7 +2726,7 @@ def check_price_touch_level(current_price, target_price, operator, previous_pric
             # For exact match, check if price crossed the exact level
             tolerance = 0.01
             if (abs(previous_price - target_price) > tolerance and 
-                abs(current_price - target_price) <= tolerance):
+                distance <= tolerance):
                 crossed = True
                 crossed_today = True
                 direction = 'up' if previous_price < target_price else 'down'
@@ -2060,7 +2741,7 @@ def check_price_touch_level(current_price, target_price, operator, previous_pric
             direction = 'above'
         elif operator == '<' and current_price < target_price:
             direction = 'below'
-        elif operator == '==' and abs(current_price - target_price) <= 0.01:
+        elif operator == '==' and distance <= 0.01:
             direction = 'at_level'
         else:
             if current_price > target_price:
@@ -2073,7 +2754,6 @@ def check_price_touch_level(current_price, target_price, operator, previous_pric
         status = 'crossed'
     else:
         # Check how close we are to the target
-        distance = abs(current_price - target_price)
         if distance <= target_price * 0.01:  # Within 1%
             status = 'close'
         else:
@@ -2084,13 +2764,23 @@ def check_price_touch_level(current_price, target_price, operator, previous_pric
         'crossed_today': crossed_today,
         'direction': direction,
         'status': status,
-        'distance': abs(current_price - target_price),
-        'distance_percent': abs(current_price - target_price) / target_price * 100 if target_price > 0 else 0,
+        'distance': distance,
+        'distance_percent': distance / target_price * 100 if target_price > 0 else 0,
         'current_price': current_price,
         'target_price': target_price,
         'operator': operator
     }
 
+# Update alert count to 1 (triggered once) and mark as triggered
+_SQL_MARK_ALERT_TRIGGERED = '''
+    UPDATE alerts 
+    SET alert_count = 1, 
+        last_triggered_at = ?,
+        last_triggered_price = ?,
+        status = 'triggered'
+    WHERE uuid = ?
+'''
+
 def check_alert_triggers():
     """Check if any stored alerts should be triggered based on current prices"""
     global kite
@@ -2099,32 +2789,40 @@ def check_alert_triggers():
         if not kite:
             return []
         
-        # Fetch current prices for NIFTY 50 and NIFTY BANK
-        nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-        bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
-        
-        current_prices = {
-            'NIFTY 50': nifty_data.get('last_price', 0),
-            'NIFTY BANK': bank_nifty_data.get('last_price', 0)
-        }
-        
-        # Get all active alerts from database
-        conn = sqlite3.connect(DATABASE_FILE)
+        # Get active alerts on the instruments we have prices for; only NIFTY 50
+        # and NIFTY BANK are quoted, so other symbols are filtered out in SQL
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT uuid, name, lhs_tradingsymbol, operator, rhs_constant, status, alert_count
             FROM alerts
             WHERE status = 'enabled' AND alert_count = 0
+              AND lhs_tradingsymbol IN ('NIFTY 50', 'NIFTY BANK')
         ''')
         
         alerts = cursor.fetchall()
         triggered_alerts = []
         
+        if not alerts:
+            conn.close()
+            return triggered_alerts
+        
+        # Fetch current prices for NIFTY 50 and NIFTY BANK
+        nifty_data, bank_nifty_data = get_index_quotes()
+        
+        current_prices = {
+            'NIFTY 50': nifty_data.get('last_price', 0),
+            'NIFTY BANK': bank_nifty_data.get('last_price', 0)
+        }
+        
+        # One timestamp for every alert triggered in this check
+        triggered_at = datetime.now().isoformat()
+        
         for alert in alerts:
             uuid, name, symbol, operator, target_value, status, alert_count = alert
             
-            current_price = current_prices.get(symbol, 0)
+            current_price = current_prices[symbol]
             if current_price == 0:
                 continue
             
@@ -2142,8 +2840,6 @@ def check_alert_triggers():
                 is_triggered = True
             
             if is_triggered:
-                # Update alert status to triggered
-                update_alert_trigger_status(uuid, current_price, alert_count + 1)
                 triggered_alerts.append({
                     'uuid': uuid,
                     'name': name,
@@ -2151,9 +2847,18 @@ def check_alert_triggers():
                     'current_price': current_price,
                     'target_price': target_value,
                     'operator': operator,
-                    'triggered_at': datetime.now().isoformat()
+                    'triggered_at': triggered_at
                 })
         
+        if triggered_alerts:
+            # Mark every triggered alert in one statement batch on this connection
+            cursor.executemany(_SQL_MARK_ALERT_TRIGGERED, [
+                (triggered_at, alert['current_price'], alert['uuid'])
+                for alert in triggered_alerts
+            ])
+            conn.commit()
+            for alert in triggered_alerts:
+                print(f"Alert triggered once: {alert['uuid']} at price {alert['current_price']} - now marked as triggered")
         conn.close()
         return triggered_alerts
         
@@ -2161,21 +2866,16 @@ def check_alert_triggers():
         print(f"Error checking alert triggers: {e}")
         return []
 
-def update_alert_trigger_status(uuid, current_price, new_alert_count):
+def update_alert_trigger_status(uuid, current_price, new_alert_count, triggered_at=None):
     """Update alert status when triggered - mark as triggered (one-time only)"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Update alert count to 1 (triggered once) and mark as triggered
-        cursor.execute('''
-            UPDATE alerts 
-            SET alert_count = 1, 
-                last_triggered_at = ?,
-                last_triggered_price = ?,
-                status = 'triggered'
-            WHERE uuid = ?
-        ''', (datetime.now().isoformat(), current_price, uuid))
+        if triggered_at is None:
+            triggered_at = datetime.now().isoformat()
+        
+        cursor.execute(_SQL_MARK_ALERT_TRIGGERED, (triggered_at, current_price, uuid))
         
         conn.commit()
         conn.close()
@@ -2195,7 +2895,7 @@ def update_alert_trigger_status(uuid, current_price, new_alert_count):
 def trend_monitoring_worker():
     """
     Background thread worker that continuously monitors prices and checks for trend reversals.
-    Runs in a loop, checking every second for trend reversals.
+    Runs a check (at most once per second) whenever new index prices have arrived.
     """
     global trend_monitoring_running, nifty_prices, bank_nifty_prices
     
@@ -2203,15 +2903,28 @@ def trend_monitoring_worker():
     
     while trend_monitoring_running:
         try:
+            # Sleep until on_tick appends a new index price. Without new prices a
+            # pass would re-check the same data, so a timed-out wait skips it; the
+            # timeout only bounds how long a stop request goes unnoticed
+            if not trend_price_event.wait(1):
+                continue
+            trend_price_event.clear()
+            
+            # Read levels for both instruments once per tick (cached between writes)
+            levels_data = None
+            if len(nifty_prices) > 0 or len(bank_nifty_prices) > 0:
+                levels_data = get_levels_cached('default_user')
+            
             # Check NIFTY 50 for trend reversals
             if len(nifty_prices) > 0:
-                check_trend_reversal("NIFTY 50", "NIFTY_50", nifty_prices)
+                check_trend_reversal("NIFTY 50", "NIFTY_50", nifty_prices, levels_data)
             
             # Check NIFTY BANK for trend reversals
             if len(bank_nifty_prices) > 0:
-                check_trend_reversal("NIFTY BANK", "NIFTY_BANK", bank_nifty_prices)
+                check_trend_reversal("NIFTY BANK", "NIFTY_BANK", bank_nifty_prices, levels_data)
             
-            # Sleep for 1 second before next check
+            # At most one pass per second; ticks arriving meanwhile set the event
+            # again and are handled together in the next pass
             time.sleep(1)
             
         except Exception as e:
@@ -2228,13 +2941,20 @@ def start_trend_monitoring():
     """
     global trend_monitoring_running, trend_monitoring_thread
     
+    # Double-checked: the unlocked read is the fast path once running, the locked
+    # re-check stops two concurrent callers from starting two threads
     if trend_monitoring_running:
         print("Trend monitoring thread already running")
         return
     
-    trend_monitoring_running = True
-    trend_monitoring_thread = threading.Thread(target=trend_monitoring_worker, daemon=True)
-    trend_monitoring_thread.start()
+    with _monitoring_start_lock:
+        if trend_monitoring_running:
+            print("Trend monitoring thread already running")
+            return
+        
+        trend_monitoring_running = True
+        trend_monitoring_thread = threading.Thread(target=trend_monitoring_worker, daemon=True)
+        trend_monitoring_thread.start()
     print("✅ Started trend monitoring background thread")
 
 
@@ -2248,6 +2968,7 @@ def stop_trend_monitoring():
         return
     
     trend_monitoring_running = False
+    trend_price_event.set()  # Wake the worker so it sees the stop request
     print("🛑 Stopping trend monitoring background thread")
     
     # Wait for thread to finish (with timeout)
@@ -2259,6 +2980,99 @@ def stop_trend_monitoring():
 # Paper Trade Monitoring Background Thread
 # ============================================================================
 
+# In-memory index of today's open paper trades for the monitoring thread, so a
+# monitor pass does not query the database. Seeded from the database for the
+# current day and kept in sync by save_paper_trade_entry / update_paper_trade_exit.
+# Dictionary: {'trade_uuid': OpenPaperTrade}, only touched under the lock.
+# Every change also publishes a fresh tuple snapshot that readers use lock-free.
+_open_paper_trades = {}
+_open_paper_trades_snapshot = ()
+_open_paper_trades_date = None  # Day the index was seeded for (ISO date)
+_open_paper_trades_rollover_at = 0.0  # Epoch of the next local midnight; reseed after it
+_open_paper_trades_lock = threading.Lock()
+_OPEN_PAPER_TRADES_USER = 'default_user'  # User whose trades the monitor watches
+
+# Index entry: only the fields the monitor reads, with the quote key precomputed
+OpenPaperTrade = namedtuple('OpenPaperTrade', [
+    'trade_uuid', 'tradingsymbol', 'exchange', 'option_key',
+    'quantity', 'entry_price', 'target_price', 'stoploss_price'
+])
+
+def _publish_open_paper_trades():
+    """Replace the readers' snapshot of the index (call with the lock held)"""
+    global _open_paper_trades_snapshot
+    
+    # A single reference assignment: readers see either the old or the new tuple
+    _open_paper_trades_snapshot = tuple(_open_paper_trades.values())
+
+def _seed_open_paper_trades():
+    """
+    (Re)load today's open paper trades into the in-memory index.
+    
+    If the read fails the index, its date and its rollover time are left as
+    they were, so the next get_open_paper_trades() call retries the seed.
+    """
+    global _open_paper_trades, _open_paper_trades_date, _open_paper_trades_rollover_at
+    
+    today = date.today()
+    # Precompute the day boundary once so callers compare a single float per pass
+    rollover_at = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    # The query runs under the lock: trades saved or closed meanwhile commit first
+    # and then wait here, so their index update applies on top of the new dict
+    # instead of being lost (or undone) when it replaces the old one
+    with _open_paper_trades_lock:
+        try:
+            trades = iter_paper_trades(user_id=_OPEN_PAPER_TRADES_USER, status='OPEN',
+                                       date_filter=today.isoformat())
+            open_trades = {
+                trade['trade_uuid']: OpenPaperTrade(
+                    trade['trade_uuid'], trade['tradingsymbol'], trade['exchange'],
+                    f"{trade['exchange']}:{trade['tradingsymbol']}",
+                    trade['quantity'], trade['entry_price'], trade['target_price'], trade['stoploss_price']
+                )
+                for trade in trades
+            }
+        except Exception as e:
+            print(f"Error loading open paper trades: {e}")
+            return
+        _open_paper_trades = open_trades
+        _publish_open_paper_trades()
+        _open_paper_trades_date = today.isoformat()
+        _open_paper_trades_rollover_at = rollover_at
+
+def _add_open_paper_trade(trade, user_id):
+    """Add a newly opened paper trade to the in-memory index"""
+    if user_id != _OPEN_PAPER_TRADES_USER:
+        return
+    with _open_paper_trades_lock:
+        # Trades opened before the index is seeded are picked up by the seed
+        if _open_paper_trades_date is not None:
+            _open_paper_trades[trade.trade_uuid] = trade
+            _publish_open_paper_trades()
+
+def _remove_open_paper_trade(trade_uuid, user_id):
+    """Remove a closed paper trade from the in-memory index"""
+    if user_id != _OPEN_PAPER_TRADES_USER:
+        return
+    with _open_paper_trades_lock:
+        if _open_paper_trades.pop(trade_uuid, None) is not None:
+            _publish_open_paper_trades()
+
+def get_open_paper_trades():
+    """
+    Get today's open paper trades from the in-memory index (reseeded on a new day).
+    
+    The result is a shared, immutable snapshot; reading it takes no lock, so
+    the monitor never waits on (or blocks) trades being opened or closed.
+    
+    Returns:
+        tuple: OpenPaperTrade entries
+    """
+    if time.time() >= _open_paper_trades_rollover_at:
+        _seed_open_paper_trades()
+    return _open_paper_trades_snapshot
+
+
 def paper_trade_monitoring_worker():
     """
     Background thread worker that continuously monitors paper trades and checks for target/stop loss.
@@ -2269,84 +3083,153 @@ def paper_trade_monitoring_worker():
     
     print("📝 Paper trade monitoring background thread started (using WebSocket prices)")
     
+    # Last price checked per open trade that did not exit; a trade whose price has
+    # not moved since then needs neither the exit checks nor a database write
+    last_checked_prices = {}
+    
+    # Write-behind buffer of current prices {trade_uuid: price}, flushed every
+    # PAPER_TRADE_PRICE_FLUSH_INTERVAL seconds instead of on every pass
+    pending_prices = {}
+    next_price_flush = 0
+    
     while paper_trade_monitoring_running:
         try:
-            # Get all open paper trades
-            open_trades = get_paper_trades(status='OPEN')
+            # Get all open paper trades (from the in-memory index, not the database)
+            open_trades = get_open_paper_trades()
             
             if not open_trades:
+                # Buffered prices can only belong to trades closed elsewhere
+                last_checked_prices.clear()
+                pending_prices.clear()
                 time.sleep(2)  # Sleep shorter if no open trades
                 continue
             
-            # Check each open paper trade
+            # Exits are written at the end of the pass; price updates go to the buffer
+            exits = []
+            # Rebuilt every pass so closed trades drop out
+            checked_prices = {}
+            
+            # WebSocket prices first (real-time); trades without a usable one are
+            # quoted over REST together, in one request per pass
+            trade_prices = []
+            rest_keys = set()
             for trade in open_trades:
-                try:
-                    tradingsymbol = trade['tradingsymbol']
-                    exchange = trade['exchange']
-                    entry_price = trade['entry_price']
-                    target_price = trade['target_price']
-                    stoploss_price = trade['stoploss_price']
-                    trade_uuid = trade['trade_uuid']
-                    
-                    # First, try to get price from WebSocket (real-time)
+                current_price = None
+                option_key = trade.option_key
+                
+                if option_key in option_websocket_prices:
+                    ws_data = option_websocket_prices[option_key]
+                    current_price = ws_data.get('last_price', 0)
+                    # Use WebSocket price if available and recent (within last 10 seconds)
+                    received_at = ws_data.get('received_at')
+                    if received_at and time.time() - received_at > 10:
+                        current_price = None  # Price is stale, fallback to REST
+                
+                if current_price is None or current_price == 0:
                     current_price = None
-                    option_key = f"{exchange}:{tradingsymbol}"
-                    
-                    if option_key in option_websocket_prices:
-                        ws_data = option_websocket_prices[option_key]
-                        current_price = ws_data.get('last_price', 0)
-                        # Use WebSocket price if available and recent (within last 10 seconds)
-                        timestamp = ws_data.get('timestamp')
-                        if timestamp:
-                            try:
-                                price_time = datetime.fromisoformat(timestamp)
-                                time_diff = (datetime.now() - price_time).total_seconds()
-                                if time_diff > 10:  # Price is stale, fallback to REST
-                                    current_price = None
-                            except:
-                                pass
+                    rest_keys.add(option_key)
+                trade_prices.append((trade, current_price))
+            
+            rest_quotes = {}
+            if rest_keys and kite:
+                try:
+                    rest_quotes = get_quotes(rest_keys)
+                except Exception as e:
+                    # Silently continue if REST API fails; those trades are skipped this pass
+                    pass
+            
+            # Check each open paper trade
+            for trade, current_price in trade_prices:
+                try:
+                    target_price = trade.target_price
+                    stoploss_price = trade.stoploss_price
+                    trade_uuid = trade.trade_uuid
+                    option_key = trade.option_key
                     
-                    # Fallback to REST API if WebSocket price not available
-                    if current_price is None or current_price == 0:
-                        if kite:
-                            try:
-                                option_quote = kite.quote(option_key)
-                                option_data = option_quote.get(option_key, {})
-                                current_price = option_data.get("last_price", 0)
-                                
-                                if current_price == 0:
-                                    # Try to get from depth
-                                    current_price = option_data.get("depth", [{}])[0].get("price", 0) if option_data.get("depth") else 0
-                            except Exception as e:
-                                # Silently continue if REST API fails
-                                continue
-                        else:
+                    # Fallback to the REST quote if WebSocket price not available
+                    if current_price is None:
+                        option_data = rest_quotes.get(option_key)
+                        if option_data is None:
+                            continue
+                        try:
+                            current_price = option_data.get("last_price", 0)
+                            
+                            if current_price == 0:
+                                # Try to get from depth
+                                current_price = option_data.get("depth", [{}])[0].get("price", 0) if option_data.get("depth") else 0
+                        except Exception as e:
                             continue
                     
                     if current_price > 0:
-                        # Update current price in database
-                        update_paper_trade_current_price(trade_uuid, current_price)
+                        # Unchanged since the last pass: same outcome, nothing to write
+                        if last_checked_prices.get(trade_uuid) == current_price:
+                            checked_prices[trade_uuid] = current_price
+                            continue
                         
                         # Check if target is hit (15% profit)
                         if current_price >= target_price:
-                            update_paper_trade_exit(trade_uuid, current_price, 'TARGET')
-                            print(f"📝 Paper trade {trade_uuid} hit TARGET at {current_price:.2f} (WebSocket: {option_key in option_websocket_prices})")
+                            exits.append((trade, current_price, 'TARGET', option_key))
                         
                         # Check if stop loss is hit (5% loss)
                         elif current_price <= stoploss_price:
-                            update_paper_trade_exit(trade_uuid, current_price, 'STOPLOSS')
-                            print(f"📝 Paper trade {trade_uuid} hit STOPLOSS at {current_price:.2f} (WebSocket: {option_key in option_websocket_prices})")
+                            exits.append((trade, current_price, 'STOPLOSS', option_key))
+                        
+                        # Buffer current price update for the database (closing a
+                        # trade stores its exit price as the current price)
+                        else:
+                            pending_prices[trade_uuid] = current_price
+                            checked_prices[trade_uuid] = current_price
                         
                 except Exception as e:
                     print(f"Error processing paper trade: {e}")
             
-            # Sleep for 1 second before next check (faster for real-time monitoring)
-            time.sleep(1)
+            last_checked_prices = checked_prices
+            
+            if exits:
+                # The close writes the exit price; a buffered price is no longer needed
+                for trade, _, _, _ in exits:
+                    pending_prices.pop(trade.trade_uuid, None)
+                
+                # P&L is computed once here from the indexed entry price and used for
+                # both the database rows and the log lines
+                closing = []
+                for trade, current_price, exit_reason, _ in exits:
+                    entry_price = trade.entry_price
+                    profit_loss = (current_price - entry_price) * trade.quantity
+                    profit_loss_percent = (current_price - entry_price) * 100.0 / entry_price if entry_price else 0
+                    closing.append((trade.trade_uuid, current_price, exit_reason, profit_loss, profit_loss_percent))
+                
+                # All exits of this pass are written in one transaction
+                closed = close_paper_trades(closing)
+                
+                for (trade, current_price, exit_reason, option_key), (_, _, _, profit_loss, profit_loss_percent) in zip(exits, closing):
+                    print(f"📝 Paper trade {trade.trade_uuid} hit {exit_reason} at {current_price:.2f} (WebSocket: {option_key in option_websocket_prices})")
+                    if trade.trade_uuid in closed:
+                        result = "PROFIT" if profit_loss > 0 else "LOSS"
+                        print(f"✅ Paper trade exit updated: {trade.trade_uuid} - {result} of {abs(profit_loss):.2f} ({profit_loss_percent:.2f}%)")
+            
+            # Flush buffered prices; on failure they are kept and retried next interval
+            now = time.monotonic()
+            if pending_prices and now >= next_price_flush:
+                if update_paper_trade_current_prices(list(pending_prices.items())):
+                    pending_prices.clear()
+                next_price_flush = now + PAPER_TRADE_PRICE_FLUSH_INTERVAL
+            
+            # Wait up to 1 second before next check, waking early when option ticks
+            # arrive; ticks received meanwhile are coalesced into one pass (the price
+            # dict only holds the latest price per option)
+            time.sleep(PAPER_MONITOR_MIN_INTERVAL)
+            paper_trade_price_event.wait(1 - PAPER_MONITOR_MIN_INTERVAL)
+            paper_trade_price_event.clear()
             
         except Exception as e:
             print(f"Error in paper trade monitoring thread: {e}")
             time.sleep(1)  # Continue even if there's an error
     
+    # Do not lose the last buffered prices when the monitor is stopped
+    if pending_prices:
+        update_paper_trade_current_prices(list(pending_prices.items()))
+    
     print("📝 Paper trade monitoring background thread stopped")
 
 
@@ -2355,17 +3238,49 @@ def subscribe_existing_paper_trades_to_websocket():
     Subscribe to all existing open paper trades in WebSocket for real-time price tracking.
     This should be called when WebSocket is ready.
     """
+    global option_symbol_to_token, option_token_to_symbol, option_websocket_prices
+    
+    if not continuous_kws or not continuous_websocket_running or not kite:
+        print("⚠️  WebSocket or KiteConnect not ready - cannot subscribe existing paper trades")
+        return
+    
     try:
         open_trades = get_paper_trades(status='OPEN')
         if not open_trades:
             return
         
+        # Resolve every token first (one symbol index per exchange), then subscribe
+        # them all in one message instead of one subscribe/set_mode pair per trade
+        new_tokens = []
         subscribed_count = 0
         for trade in open_trades:
             tradingsymbol = trade['tradingsymbol']
             exchange = trade['exchange']
-            if subscribe_option_to_websocket(tradingsymbol, exchange):
+            
+            if tradingsymbol in option_symbol_to_token:
                 subscribed_count += 1
+                continue
+            
+            option_token = _get_symbol_index(exchange).get(tradingsymbol)
+            if option_token is None:
+                print(f"⚠️  Option {tradingsymbol} not found in instruments")
+                continue
+            
+            option_symbol_to_token[tradingsymbol] = option_token
+            option_token_to_symbol[option_token] = {
+                'tradingsymbol': tradingsymbol,
+                'exchange': exchange
+            }
+            option_websocket_prices[f"{exchange}:{tradingsymbol}"] = {
+                'last_price': 0,
+                'timestamp': None
+            }
+            new_tokens.append(option_token)
+            subscribed_count += 1
+        
+        if new_tokens:
+            continuous_kws.subscribe(new_tokens)
+            continuous_kws.set_mode(continuous_kws.MODE_LTP, new_tokens)
         
         if subscribed_count > 0:
             print(f"✅ Subscribed {subscribed_count} existing paper trades to WebSocket")
@@ -2380,16 +3295,22 @@ def start_paper_trade_monitoring():
     """
     global paper_trade_monitoring_running, paper_trade_monitoring_thread
     
+    # Double-checked, as in start_trend_monitoring
     if paper_trade_monitoring_running:
         print("Paper trade monitoring thread already running")
         return
     
-    # Subscribe to existing open paper trades
-    subscribe_existing_paper_trades_to_websocket()
-    
-    paper_trade_monitoring_running = True
-    paper_trade_monitoring_thread = threading.Thread(target=paper_trade_monitoring_worker, daemon=True)
-    paper_trade_monitoring_thread.start()
+    with _monitoring_start_lock:
+        if paper_trade_monitoring_running:
+            print("Paper trade monitoring thread already running")
+            return
+        
+        # Subscribe to existing open paper trades
+        subscribe_existing_paper_trades_to_websocket()
+        
+        paper_trade_monitoring_running = True
+        paper_trade_monitoring_thread = threading.Thread(target=paper_trade_monitoring_worker, daemon=True)
+        paper_trade_monitoring_thread.start()
     print("✅ Started paper trade monitoring background thread")
 
 
@@ -2410,6 +3331,24 @@ def stop_paper_trade_monitoring():
         paper_trade_monitoring_thread.join(timeout=2)
 
 
+# Relative distance between a level and a trade's underlying entry price for
+# the trade to count as placed at that level
+PAPER_TRADE_LEVEL_TOLERANCE = 0.01
+
+_SQL_SELECT_LEVELS_WITH_PAPER_TRADE = '''
+    SELECT l.uuid, l.index_type, l.level_value
+    FROM level l
+    WHERE l.user_id = ?
+      AND EXISTS (
+          SELECT 1 FROM paper_trades p
+          WHERE p.user_id = l.user_id
+            AND p.instrument = l.index_type
+            AND p.underlying_entry_price BETWEEN l.level_value - l.level_value * ?
+                                             AND l.level_value + l.level_value * ?
+      )
+    ORDER BY l.index_type, l.level_value DESC
+'''
+
 def initialize_order_flags_from_trades(user_id='default_user'):
     """
     Initialize order_placed_at_level flags from existing paper trades in database.
@@ -2418,28 +3357,30 @@ def initialize_order_flags_from_trades(user_id='default_user'):
     global order_placed_at_level
     
     try:
-        # Get all levels
-        levels_data = get_levels(user_id, today_only=False)
-        
-        # Check each level to see if a trade exists for it
-        for instrument_key in ['NIFTY_50', 'NIFTY_BANK']:
-            levels = levels_data.get(instrument_key, [])
-            for level in levels:
-                level_uuid = level['uuid']
-                level_value = level['value']
-                
-                # Check if trade exists for this level
-                if check_paper_trade_exists_for_level(level_value, instrument_key, user_id):
-                    order_placed_at_level[level_uuid] = True
-                    print(f"✅ Initialized flag for {instrument_key} level {level_value:.2f} (trade exists)")
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Only fetch levels that already have a paper trade, matched with the same
+        # tolerance as check_paper_trade_exists_for_level; the BETWEEN range lets
+        # SQLite probe ix_paper_trades_user_instrument once per level
+        cursor.execute(_SQL_SELECT_LEVELS_WITH_PAPER_TRADE, (user_id, PAPER_TRADE_LEVEL_TOLERANCE, PAPER_TRADE_LEVEL_TOLERANCE))
+        
+        # Count flags as they are set instead of re-walking order_placed_at_level
+        initialized_count = 0
+        for level_uuid, instrument_key, level_value in cursor:
+            order_placed_at_level[level_uuid] = True
+            initialized_count += 1
+            print(f"✅ Initialized flag for {instrument_key} level {level_value:.2f} (trade exists)")
         
-        print(f"📋 Initialized order flags: {len([k for k, v in order_placed_at_level.items() if v])} levels with existing trades")
+        conn.close()
+        
+        print(f"📋 Initialized order flags: {initialized_count} levels with existing trades")
         
     except Exception as e:
         print(f"Error initializing order flags from trades: {e}")
 
 
-def check_paper_trade_exists_for_level(level_value, instrument_key, user_id='default_user', tolerance=0.01):
+def check_paper_trade_exists_for_level(level_value, instrument_key, user_id='default_user', tolerance=PAPER_TRADE_LEVEL_TOLERANCE):
     """
     Check if a paper trade exists for a given level value.
     Uses underlying_entry_price to match the level (within tolerance).
@@ -2454,28 +3395,76 @@ def check_paper_trade_exists_for_level(level_value, instrument_key, user_id='def
         bool: True if a trade exists for this level, False otherwise
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Check if any paper trade exists with underlying_entry_price matching this level
-        # Use tolerance to account for small price differences
+        # Use tolerance to account for small price differences; EXISTS stops at the
+        # first match and the BETWEEN range can use ix_paper_trades_user_instrument
         tolerance_value = level_value * tolerance
         cursor.execute('''
-            SELECT COUNT(*) FROM paper_trades 
-            WHERE user_id = ? AND instrument = ? 
-            AND ABS(underlying_entry_price - ?) <= ?
-        ''', (user_id, instrument_key, level_value, tolerance_value))
+            SELECT EXISTS (
+                SELECT 1 FROM paper_trades 
+                WHERE user_id = ? AND instrument = ? 
+                AND underlying_entry_price BETWEEN ? AND ?
+            )
+        ''', (user_id, instrument_key, level_value - tolerance_value, level_value + tolerance_value))
         
-        count = cursor.fetchone()[0]
+        exists = cursor.fetchone()[0]
         conn.close()
         
-        return count > 0
+        return bool(exists)
         
     except Exception as e:
         print(f"Error checking paper trade for level: {e}")
         return False
 
 
+def iter_paper_trades(user_id='default_user', status=None, instrument=None, date_filter=None):
+    """
+    Lazily yield paper trades from database (see get_paper_trades for the filters).
+    
+    The connection stays open until the generator is exhausted or closed,
+    so callers can stream rows straight into a response.
+    
+    Yields:
+        dict: One paper trade dictionary per row
+    
+    Raises:
+        Exception: Database errors are propagated (see iter_trades)
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Add date filter - default to today if not specified
+        if date_filter is None:
+            date_filter = date.today().isoformat()
+        
+        # entry_time is stored as ISO format datetime string, so a whole day is the
+        # half-open string range [date, next date); unlike date(entry_time) = ? this
+        # compares the column directly and can use an index on entry_time
+        next_date = (date.fromisoformat(date_filter) + timedelta(days=1)).isoformat()
+        
+        # Optional filters are bound as NULL so every call shares one statement
+        status = status or None
+        instrument = instrument or None
+        cursor.execute('''
+            SELECT * FROM paper_trades
+            WHERE user_id = ?
+              AND (? IS NULL OR status = ?)
+              AND (? IS NULL OR instrument = ?)
+              AND entry_time >= ? AND entry_time < ?
+            ORDER BY entry_time DESC
+        ''', (user_id, status, status, instrument, instrument, date_filter, next_date))
+        yield from _iter_rows(cursor)
+        
+    finally:
+        if conn:
+            conn.close()
+
+
 def get_paper_trades(user_id='default_user', status=None, instrument=None, date_filter=None):
     """
     Get paper trades from database.
@@ -2487,45 +3476,11 @@ def get_paper_trades(user_id='default_user', status=None, instrument=None, date_
         date_filter: Filter by date (YYYY-MM-DD format). If None, defaults to today's date.
     
     Returns:
-        list: List of paper trade dictionaries
+        list: List of paper trade dictionaries (empty on error)
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        query = 'SELECT * FROM paper_trades WHERE user_id = ?'
-        params = [user_id]
-        
-        if status:
-            query += ' AND status = ?'
-            params.append(status)
-        
-        if instrument:
-            query += ' AND instrument = ?'
-            params.append(instrument)
-        
-        # Add date filter - default to today if not specified
-        if date_filter is None:
-            date_filter = datetime.now().date().isoformat()
-        
-        # Filter by date using SQLite date() function
-        # entry_time is stored as ISO format datetime string, so we extract the date part
-        query += ' AND date(entry_time) = ?'
-        params.append(date_filter)
-        
-        query += ' ORDER BY entry_time DESC'
-        
-        cursor.execute(query, params)
-        columns = [desc[0] for desc in cursor.description]
-        trades = []
-        
-        for row in cursor.fetchall():
-            trade_dict = dict(zip(columns, row))
-            trades.append(trade_dict)
-        
-        conn.close()
-        return trades
-        
+        return list(iter_paper_trades(user_id=user_id, status=status, instrument=instrument,
+                                      date_filter=date_filter))
     except Exception as e:
         print(f"Error getting paper trades: {e}")
         return []
@@ -2544,7 +3499,7 @@ def update_paper_trade_current_price(trade_uuid, current_price, user_id='default
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         current_time = datetime.now().isoformat()
@@ -2564,6 +3519,39 @@ def update_paper_trade_current_price(trade_uuid, current_price, user_id='default
         return False
 
 
+def update_paper_trade_current_prices(updates, user_id='default_user'):
+    """
+    Update current price for several paper trades in one transaction.
+    
+    Args:
+        updates: List of (trade_uuid, current_price) tuples
+        user_id: User ID
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        current_time = datetime.now().isoformat()
+        
+        cursor.executemany('''
+            UPDATE paper_trades 
+            SET current_price = ?, updated_at = ?
+            WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
+        ''', [(current_price, current_time, trade_uuid, user_id)
+              for trade_uuid, current_price in updates])
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"Error updating paper trade current prices: {e}")
+        return False
+
+
 def update_paper_trade_exit(trade_uuid, exit_price, exit_reason, user_id='default_user'):
     """
     Update paper trade exit information when target or stop loss is hit.
@@ -2578,48 +3566,86 @@ def update_paper_trade_exit(trade_uuid, exit_price, exit_reason, user_id='defaul
         bool: True if successful, False otherwise
     """
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
+        closed = _close_trade_row('paper_trades', trade_uuid, exit_price, exit_reason, user_id)
         
-        # Get trade entry details
-        cursor.execute('''
-            SELECT entry_price, quantity FROM paper_trades 
-            WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
-        ''', (trade_uuid, user_id))
+        # Closed now or already closed: either way the monitor should stop watching it
+        _remove_open_paper_trade(trade_uuid, user_id)
         
-        trade = cursor.fetchone()
-        if not trade:
+        if closed is None:
             print(f"Paper trade {trade_uuid} not found or already closed")
-            conn.close()
             return False
         
-        entry_price, quantity = trade
+        profit_loss, profit_loss_percent = closed
         
-        # Calculate profit/loss
-        profit_loss = (exit_price - entry_price) * quantity
-        profit_loss_percent = ((exit_price - entry_price) / entry_price) * 100
+        result = "PROFIT" if profit_loss > 0 else "LOSS"
+        print(f"✅ Paper trade exit updated: {trade_uuid} - {result} of {abs(profit_loss):.2f} ({profit_loss_percent:.2f}%)")
+        return True
+        
+    except Exception as e:
+        print(f"Error updating paper trade exit: {e}")
+        return False
+
+
+_SQL_CLOSE_PAPER_TRADE = '''
+    UPDATE paper_trades
+    SET current_price = ?, exit_price = ?, exit_time = ?, exit_reason = ?,
+        profit_loss = ?, profit_loss_percent = ?,
+        status = 'CLOSED', updated_at = ?
+    WHERE trade_uuid = ? AND user_id = ? AND status = 'OPEN'
+'''
+
+def close_paper_trades(exits, user_id='default_user'):
+    """
+    Close several paper trades in one transaction (used by the monitoring thread).
+    
+    The exit price is also stored as the trade's final current price, so exiting
+    trades need no separate current-price update.
+    
+    Args:
+        exits: List of (trade_uuid, exit_price, exit_reason, profit_loss,
+               profit_loss_percent) tuples; P&L is computed by the caller
+        user_id: User ID
+    
+    Every trade in exits leaves the in-memory index once the transaction commits,
+    whether it was closed now or already closed; if the transaction fails they
+    all stay indexed and are retried on the next pass.
+    
+    Returns:
+        set: trade_uuids actually closed by this call (trades that were already
+             closed are skipped); empty if the transaction failed
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
         
         current_time = datetime.now().isoformat()
         
-        # Update trade
-        cursor.execute('''
-            UPDATE paper_trades 
-            SET exit_price = ?, exit_time = ?, exit_reason = ?,
-                profit_loss = ?, profit_loss_percent = ?, status = 'CLOSED', updated_at = ?
-            WHERE trade_uuid = ? AND user_id = ?
-        ''', (exit_price, current_time, exit_reason, profit_loss, profit_loss_percent, 
-              current_time, trade_uuid, user_id))
+        # One statement per row (same transaction) so each row's rowcount is known
+        closed = set()
+        for trade_uuid, exit_price, exit_reason, profit_loss, profit_loss_percent in exits:
+            cursor.execute(_SQL_CLOSE_PAPER_TRADE, (
+                exit_price, exit_price, current_time, exit_reason, profit_loss, profit_loss_percent,
+                current_time, trade_uuid, user_id
+            ))
+            if cursor.rowcount == 1:
+                closed.add(trade_uuid)
         
         conn.commit()
         conn.close()
+        conn = None
         
-        result = "PROFIT" if profit_loss > 0 else "LOSS"
-        print(f"✅ Paper trade exit updated: {trade_uuid} - {result} of {abs(profit_loss):.2f} ({profit_loss_percent:.2f}%)")
-        return True
+        for trade_uuid, *_ in exits:
+            _remove_open_paper_trade(trade_uuid, user_id)
+        
+        return closed
         
     except Exception as e:
-        print(f"Error updating paper trade exit: {e}")
-        return False
+        print(f"Error closing paper trades: {e}")
+        if conn:
+            # Returning the connection to the pool rolls back the partial transaction
+            conn.close()
+        return set()
 
 
 # ============================================================================
@@ -2649,11 +3675,10 @@ def get_credentials_from_session_or_file():
     if not access_token:
         if os.path.exists(SESSION_FILE):
             try:
-                with open(SESSION_FILE, 'r') as f:
-                    data = json.load(f)
-                    access_token = data.get('access_token')
-                    if not api_key:
-                        api_key = data.get('api_key')
+                data = _read_session_file()
+                access_token = data.get('access_token')
+                if not api_key:
+                    api_key = data.get('api_key')
             except Exception as e:
                 print(f"Error loading credentials from file: {e}")
     
@@ -2667,28 +3692,43 @@ def get_instrument_tokens():
         return None, None
     
     try:
-        # Get all NSE instruments
-        instruments = kite.instruments("NSE")
-        
-        # Find tokens for NIFTY 50 and NIFTY BANK
-        nifty_token = None
-        bank_nifty_token = None
-        
-        for instrument in instruments:
-            if instrument['tradingsymbol'] == 'NIFTY 50':
-                nifty_token = instrument['instrument_token']
-            elif instrument['tradingsymbol'] == 'NIFTY BANK':
-                bank_nifty_token = instrument['instrument_token']
-            
-            if nifty_token and bank_nifty_token:
-                break
-        
-        return nifty_token, bank_nifty_token
+        # Both tokens come from the cached NSE symbol index
+        symbol_to_token = _get_symbol_index("NSE")
+        return symbol_to_token.get('NIFTY 50'), symbol_to_token.get('NIFTY BANK')
     except Exception as e:
         print(f"Error getting instrument tokens: {e}")
         # Fallback to known tokens if API call fails
         return 256265, 260105  # Standard tokens for NIFTY 50 and NIFTY BANK
 
+def get_cached_index_prices():
+    """
+    Build NIFTY 50 and NIFTY BANK prices with change/change_percent from the
+    continuous WebSocket cache, without a REST quote.
+    
+    Returns:
+        dict: {'nifty': {...}, 'bank_nifty': {...}} in the 'price_update' format,
+              or None if a last price or previous close has not been cached yet
+    """
+    prices = {}
+    for key, name in (('nifty', 'NIFTY 50'), ('bank_nifty', 'NIFTY BANK')):
+        cached = websocket_prices[name]
+        last_price = cached.get('last_price', 0)
+        previous_close = cached.get('previous_close', 0)
+        if not last_price or not previous_close:
+            return None
+        
+        change = last_price - previous_close
+        prices[key] = {
+            'name': name,
+            'current_price': last_price,
+            'change': change,
+            'change_percent': (change / previous_close) * 100,
+            'previous_close': previous_close,
+            'last_updated': cached.get('timestamp') or 'N/A'
+        }
+    return prices
+
+
 def fetch_nifty_prices_websocket(timeout=10):
     """
     Fetch Nifty 50 and Bank Nifty last traded prices using WebSocket.
@@ -2726,22 +3766,22 @@ def fetch_nifty_prices_websocket(timeout=10):
     # Instead, fall back to REST API
     print("Continuous WebSocket not running, using REST API fallback")
     
-    # Get credentials from session or file
-    api_key, access_token = get_credentials_from_session_or_file()
-    
-    # Check if we have valid credentials
-    if not api_key or not access_token:
-        return {
-            'NIFTY 50': {'last_price': 0, 'timestamp': None, 'error': 'Not authenticated. Please login first.'},
-            'NIFTY BANK': {'last_price': 0, 'timestamp': None, 'error': 'Not authenticated. Please login first.'}
-        }
-    
     # Check if kite object is initialized, if not, initialize it
+    # (credentials are only needed to build a new client)
     global kite
     if not kite:
+        # Get credentials from session or file
+        api_key, access_token = get_credentials_from_session_or_file()
+        
+        # Check if we have valid credentials
+        if not api_key or not access_token:
+            return {
+                'NIFTY 50': {'last_price': 0, 'timestamp': None, 'error': 'Not authenticated. Please login first.'},
+                'NIFTY BANK': {'last_price': 0, 'timestamp': None, 'error': 'Not authenticated. Please login first.'}
+            }
+        
         try:
-            kite = KiteConnect(api_key=api_key)
-            kite.set_access_token(access_token)
+            kite = create_kite_client(api_key, access_token)
         except Exception as e:
             return {
                 'NIFTY 50': {'last_price': 0, 'timestamp': None, 'error': f'Error initializing KiteConnect: {str(e)}'},
@@ -2750,17 +3790,24 @@ def fetch_nifty_prices_websocket(timeout=10):
     
     # Use REST API as fallback instead of creating temporary WebSocket
     try:
-        nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-        bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+        nifty_data, bank_nifty_data = get_index_quotes()
+        
+        # The current time is only formatted when a quote has no timestamp
+        nifty_timestamp = nifty_data.get('timestamp')
+        bank_nifty_timestamp = bank_nifty_data.get('timestamp')
+        if nifty_timestamp is None or bank_nifty_timestamp is None:
+            now = datetime.now().isoformat()
+            nifty_timestamp = nifty_timestamp if nifty_timestamp is not None else now
+            bank_nifty_timestamp = bank_nifty_timestamp if bank_nifty_timestamp is not None else now
         
         return {
             'NIFTY 50': {
                 'last_price': nifty_data.get('last_price', 0),
-                'timestamp': nifty_data.get('timestamp', datetime.now().isoformat())
+                'timestamp': nifty_timestamp
             },
             'NIFTY BANK': {
                 'last_price': bank_nifty_data.get('last_price', 0),
-                'timestamp': bank_nifty_data.get('timestamp', datetime.now().isoformat())
+                'timestamp': bank_nifty_timestamp
             }
         }
     except Exception as e:
@@ -2788,8 +3835,7 @@ def start_continuous_websocket():
     # Ensure kite is initialized
     if not kite:
         try:
-            kite = KiteConnect(api_key=api_key)
-            kite.set_access_token(access_token)
+            kite = create_kite_client(api_key, access_token)
         except Exception as e:
             print(f"Error initializing KiteConnect for continuous WebSocket: {e}")
             return
@@ -2803,16 +3849,30 @@ def start_continuous_websocket():
     
     continuous_websocket_running = True
     
+    # Index token -> (instrument name, key in the 'price_update' payload)
+    index_by_token = {
+        nifty_token: ('NIFTY 50', 'nifty'),
+        bank_nifty_token: ('NIFTY BANK', 'bank_nifty')
+    }
+    # Instrument name -> (last_price, previous_close) last sent to clients
+    last_emitted = {}
+    
     def on_ticks(ws, ticks):
         """Callback to receive ticks and broadcast to all connected clients"""
         try:
             price_updates = {}
+            # Signatures of this frame's updates, recorded once the emit succeeds
+            emitted_signatures = {}
             global price_history, option_websocket_prices, option_token_to_symbol  # Access global variables
             
+            # All ticks in one frame arrive together, so stamp them once
+            received_at = time.time()
+            timestamp = datetime.fromtimestamp(received_at).isoformat()
+            option_ticked = False
+            
             for tick in ticks:
                 instrument_token = tick['instrument_token']
                 last_price = tick.get('last_price', 0)
-                timestamp = datetime.now().isoformat()
                 
                 # Check if this is an option instrument (for paper trading)
                 if instrument_token in option_token_to_symbol:
@@ -2823,104 +3883,84 @@ def start_continuous_websocket():
                     option_key = f"{exchange}:{tradingsymbol}"
                     option_websocket_prices[option_key] = {
                         'last_price': last_price,
-                        'timestamp': timestamp
+                        'timestamp': timestamp,
+                        'received_at': received_at  # Epoch seconds, for staleness checks
                     }
+                    option_ticked = True
                     # Continue to next tick (don't process as underlying)
                     continue
                 
-                if instrument_token == nifty_token:
-                    price_updates['nifty'] = {
-                        'name': 'NIFTY 50',
-                        'current_price': last_price,
-                        'previous_close': websocket_prices['NIFTY 50'].get('previous_close', 0),
-                        'last_updated': timestamp
-                    }
-                    websocket_prices['NIFTY 50'] = {
-                        'last_price': last_price,
-                        'timestamp': timestamp,
-                        'previous_close': websocket_prices['NIFTY 50'].get('previous_close', 0)
-                    }
-                    # Append Nifty price to deque (for general history)
-                    price_history.append({
-                        'instrument': 'NIFTY 50',
-                        'price': last_price,
-                        'timestamp': timestamp
-                    })
-                    # Process tick for trend detection and entry logic
-                    # Entry price will be fetched from cache (loaded from DB on startup)
-                    on_tick(last_price, instrument="NIFTY 50")
-                elif instrument_token == bank_nifty_token:
-                    price_updates['bank_nifty'] = {
-                        'name': 'NIFTY BANK',
-                        'current_price': last_price,
-                        'previous_close': websocket_prices['NIFTY BANK'].get('previous_close', 0),
-                        'last_updated': timestamp
-                    }
-                    websocket_prices['NIFTY BANK'] = {
-                        'last_price': last_price,
-                        'timestamp': timestamp,
-                        'previous_close': websocket_prices['NIFTY BANK'].get('previous_close', 0)
-                    }
-                    # Append Bank Nifty price to deque (for general history)
-                    price_history.append({
-                        'instrument': 'NIFTY BANK',
-                        'price': last_price,
-                        'timestamp': timestamp
-                    })
-                    # Process tick for trend detection and entry logic
-                    # Entry price will be fetched from cache (loaded from DB on startup)
-                    on_tick(last_price, instrument="NIFTY BANK")
-            
-            # Broadcast price updates to all connected clients
-            if price_updates:
-                # Calculate change/change_percent from WebSocket data (no REST API call needed)
-                if 'nifty' in price_updates:
-                    previous_close = websocket_prices['NIFTY 50'].get('previous_close', 0)
-                    current_price = price_updates['nifty']['current_price']
-                    if previous_close > 0:
-                        change = current_price - previous_close
-                        change_percent = (change / previous_close) * 100
-                        price_updates['nifty']['change'] = change
-                        price_updates['nifty']['change_percent'] = change_percent
-                    else:
-                        price_updates['nifty']['change'] = 0
-                        price_updates['nifty']['change_percent'] = 0
+                index = index_by_token.get(instrument_token)
+                if index is None:
+                    continue
                 
-                if 'bank_nifty' in price_updates:
-                    previous_close = websocket_prices['NIFTY BANK'].get('previous_close', 0)
-                    current_price = price_updates['bank_nifty']['current_price']
+                # Build the update (change/change_percent included) and the cache
+                # entry once, from the same previous close
+                name, update_key = index
+                previous_close = websocket_prices[name].get('previous_close', 0)
+                
+                # Republished ticks with an unchanged price (and previous close) are
+                # not sent to clients, which already show them; the cache, history
+                # and trend deque still record the tick below
+                signature = (last_price, previous_close)
+                if emitted_signatures.get(name, last_emitted.get(name)) != signature:
+                    emitted_signatures[name] = signature
                     if previous_close > 0:
-                        change = current_price - previous_close
+                        change = last_price - previous_close
                         change_percent = (change / previous_close) * 100
-                        price_updates['bank_nifty']['change'] = change
-                        price_updates['bank_nifty']['change_percent'] = change_percent
                     else:
-                        price_updates['bank_nifty']['change'] = 0
-                        price_updates['bank_nifty']['change_percent'] = 0
+                        change = 0
+                        change_percent = 0
+                    
+                    price_updates[update_key] = {
+                        'name': name,
+                        'current_price': last_price,
+                        'previous_close': previous_close,
+                        'last_updated': timestamp,
+                        'change': change,
+                        'change_percent': change_percent
+                    }
                 
+                websocket_prices[name] = {
+                    'last_price': last_price,
+                    'timestamp': timestamp,
+                    'previous_close': previous_close
+                }
+                # Append price to deque (for general history)
+                price_history.append(PriceTick(name, last_price, timestamp))
+                # Process tick for trend detection and entry logic
+                # Entry price will be fetched from cache (loaded from DB on startup)
+                on_tick(last_price, instrument=name)
+            
+            # Wake the paper trade monitor once per frame with new option prices
+            if option_ticked:
+                paper_trade_price_event.set()
+            
+            # Broadcast price updates to all connected clients
+            if price_updates:
                 # Emit to all connected clients
                 # When called from outside a request context (background thread), 
                 # socketio.emit() broadcasts to all clients by default
                 if socketio:
                     try:
                         socketio.emit('price_update', price_updates)
+                        # A failed emit leaves these unrecorded, so the prices are resent
+                        last_emitted.update(emitted_signatures)
                         # Only log occasionally to avoid spam (every 10th update)
                         if hasattr(on_ticks, '_update_count'):
                             on_ticks._update_count += 1
                         else:
                             on_ticks._update_count = 1
-                        if on_ticks._update_count % 10 == 0:
-                            print(f"Emitted price update #{on_ticks._update_count}: NIFTY={price_updates.get('nifty', {}).get('current_price', 'N/A')}, BANK_NIFTY={price_updates.get('bank_nifty', {}).get('current_price', 'N/A')}")
+                        if on_ticks._update_count % 10 == 0 and logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"Emitted price update #{on_ticks._update_count}: NIFTY={price_updates.get('nifty', {}).get('current_price', 'N/A')}, BANK_NIFTY={price_updates.get('bank_nifty', {}).get('current_price', 'N/A')}")
                     except Exception as emit_error:
                         print(f"Error emitting price update: {emit_error}")
-                        import traceback
                         traceback.print_exc()
                 else:
                     print("Warning: socketio is None, cannot emit price updates")
                 
         except Exception as e:
             print(f"Error processing ticks in continuous WebSocket: {e}")
-            import traceback
             traceback.print_exc()
     
     def on_connect(ws, response):
@@ -2941,8 +3981,7 @@ def start_continuous_websocket():
             try:
                 global kite
                 if kite:
-                    nifty_data = kite.quote("NSE:NIFTY 50").get('NSE:NIFTY 50', {})
-                    bank_nifty_data = kite.quote("NSE:NIFTY BANK").get('NSE:NIFTY BANK', {})
+                    nifty_data, bank_nifty_data = get_index_quotes()
                     
                     previous_close_nifty = nifty_data.get('ohlc', {}).get('close', 0)
                     previous_close_bank = bank_nifty_data.get('ohlc', {}).get('close', 0)
@@ -2962,8 +4001,9 @@ def start_continuous_websocket():
         close_msg = f"Continuous WebSocket closed: {code} - {reason}"
         print(f"🔌 {close_msg}")
         
-        # Check if it's an authentication error
-        if code == 403 or (reason and ("403" in str(reason) or "Forbidden" in str(reason) or "upgrade failed" in str(reason).lower())):
+        # Check if it's an authentication error (reason converted to text once)
+        reason_text = str(reason) if reason else ''
+        if code == 403 or (reason_text and _WS_CLOSE_AUTH_RE.search(reason_text)):
             print("⚠️  WebSocket connection was closed due to authentication failure (403 Forbidden)")
             print("   This usually means your access token has expired.")
             print("   Please login again at /login to refresh your credentials.")
@@ -2978,7 +4018,8 @@ def start_continuous_websocket():
         """Callback on error"""
         error_msg = f"Continuous WebSocket error: {code} - {reason}"
         print(f"❌ {error_msg}")
-        if code == 403 or (reason and ("403" in str(reason) or "Forbidden" in str(reason))):
+        reason_text = str(reason) if reason else ''
+        if code == 403 or (reason_text and _WS_FORBIDDEN_RE.search(reason_text)):
             print("⚠️  WebSocket authentication failed (403 Forbidden). Possible causes:")
             print("   1. Access token has expired - please login again at /login")
             print("   2. Invalid API key or access token")
@@ -2999,8 +4040,7 @@ def start_continuous_websocket():
             try:
                 # Ensure kite is initialized and test the token
                 if not kite:
-                    kite = KiteConnect(api_key=api_key)
-                    kite.set_access_token(access_token)
+                    kite = create_kite_client(api_key, access_token)
                 
                 # Test token by calling a simple API endpoint
                 profile = kite.profile()
@@ -3008,7 +4048,7 @@ def start_continuous_websocket():
             except Exception as token_error:
                 error_msg = str(token_error)
                 print(f"❌ Access token validation failed: {error_msg}")
-                if "TokenException" in error_msg or "Invalid" in error_msg or "expired" in error_msg.lower():
+                if _TOKEN_ERROR_RE.search(error_msg):
                     print("⚠️  Access token appears to be expired or invalid. Please login again at /login")
                     print("   The WebSocket connection will not be established until you re-authenticate.")
                 continuous_websocket_running = False
@@ -3027,7 +4067,7 @@ def start_continuous_websocket():
         except Exception as e:
             error_msg = str(e)
             print(f"❌ Error connecting continuous WebSocket: {error_msg}")
-            if "403" in error_msg or "Forbidden" in error_msg:
+            if _WS_FORBIDDEN_RE.search(error_msg):
                 print("⚠️  WebSocket connection was forbidden (403). This usually means:")
                 print("   1. The access token has expired - please login again at /login")
                 print("   2. The API key or access token is invalid")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Connection Pool and Open Paper Trade Index Tests
+Runs against a temporary database file (no running app needed)
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# Add the parent directory to Python path (to import services)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services
+
+
+@pytest.fixture
+def temp_database(tmp_path, monkeypatch):
+    """Point services at an empty database file with a fresh connection pool"""
+    services.close_db_pool()
+    monkeypatch.setattr(services, 'DATABASE_FILE', str(tmp_path / 'test.db'))
+    services.init_database()
+    yield
+    services.close_db_pool()
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    """Start with an unseeded open paper trade index"""
+    monkeypatch.setattr(services, '_open_paper_trades', {})
+    monkeypatch.setattr(services, '_open_paper_trades_snapshot', ())
+    monkeypatch.setattr(services, '_open_paper_trades_date', None)
+    monkeypatch.setattr(services, '_open_paper_trades_rollover_at', 0.0)
+
+
+def count_levels():
+    conn = services.get_db_connection()
+    count = conn.execute('SELECT COUNT(*) FROM level').fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_close_returns_connection_to_pool(temp_database):
+    """close() hands the underlying connection back for the next checkout"""
+    print("🧪 Testing connection reuse")
+
+    conn = services.get_db_connection()
+    raw = conn._conn
+    conn.close()
+
+    assert services._db_pool.qsize() == 1
+
+    conn = services.get_db_connection()
+    assert conn._conn is raw
+    assert services._db_pool.qsize() == 0
+    conn.close()
+
+    # A second close() is a no-op, not a second pool entry
+    conn.close()
+    assert services._db_pool.qsize() == 1
+    print("✅ Connection returned to pool and reused")
+
+
+def test_close_rolls_back_uncommitted_work(temp_database):
+    """Work the caller did not commit is dropped before the connection is reused"""
+    print("🧪 Testing rollback on close")
+
+    conn = services.get_db_connection()
+    conn.execute('''
+        INSERT INTO level (uuid, user_id, index_type, level_value, created_date, created_at, updated_at)
+        VALUES ('uncommitted', 'default_user', 'NIFTY_50', 25000, ?, ?, ?)
+    ''', (date.today().isoformat(), datetime.now().isoformat(), datetime.now().isoformat()))
+    assert conn.in_transaction
+    conn.close()
+
+    conn = services.get_db_connection()
+    assert not conn.in_transaction
+    conn.close()
+    assert count_levels() == 0
+
+    # Committed work is kept
+    services.save_level('default_user', 'NIFTY_50', 25000)
+    assert count_levels() == 1
+    print("✅ Uncommitted insert rolled back, committed insert kept")
+
+
+def save_trade(tradingsymbol):
+    return services.save_paper_trade_entry(
+        "NIFTY 50", "CALL", tradingsymbol, "NFO", 75,
+        100.0, 25000.0, 115.0, 95.0
+    )
+
+
+def test_open_trade_index_add_and_remove(temp_database, fresh_index):
+    """Opened trades are added to the index and closed trades removed"""
+    print("🧪 Testing open paper trade index")
+
+    # Seeded from the (empty) database on first read
+    assert services.get_open_paper_trades() == ()
+
+    first = save_trade('NIFTY26DEC25000CE')
+    second = save_trade('NIFTY26DEC25100CE')
+    assert first and second
+    assert {trade.trade_uuid for trade in services.get_open_paper_trades()} == {first, second}
+
+    closed = services.close_paper_trades([(first, 115.0, 'TARGET', 1125.0, 15.0)])
+    assert closed == {first}
+    assert [trade.trade_uuid for trade in services.get_open_paper_trades()] == [second]
+
+    # Closing an already closed trade changes nothing
+    assert services.close_paper_trades([(first, 115.0, 'TARGET', 1125.0, 15.0)]) == set()
+    assert [trade.trade_uuid for trade in services.get_open_paper_trades()] == [second]
+
+    # A trade closed behind the index's back is not reported, but still unindexed
+    conn = services.get_db_connection()
+    conn.execute("UPDATE paper_trades SET status = 'CLOSED' WHERE trade_uuid = ?", (second,))
+    conn.commit()
+    conn.close()
+    assert services.close_paper_trades([(second, 95.0, 'STOPLOSS', -375.0, -5.0)]) == set()
+    assert services.get_open_paper_trades() == ()
+    print("✅ Index follows trades being opened and closed")
+
+
+def test_open_trade_index_reseeds_on_new_day(temp_database, fresh_index, monkeypatch):
+    """After midnight the index only holds trades opened on the new day"""
+    print("🧪 Testing open paper trade index across a date change")
+
+    # A trade opened today, read back from the database when the index is seeded
+    earlier_trade = save_trade('NIFTY26DEC25000CE')
+    assert [trade.trade_uuid for trade in services.get_open_paper_trades()] == [earlier_trade]
+
+    # Move the clock past the next midnight
+    tomorrow = date.today() + timedelta(days=1)
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return tomorrow
+
+    rollover_at = services._open_paper_trades_rollover_at
+    monkeypatch.setattr(services, 'date', Tomorrow)
+    monkeypatch.setattr(services.time, 'time', lambda: rollover_at + 1)
+
+    assert services.get_open_paper_trades() == ()
+    assert services._open_paper_trades_date == tomorrow.isoformat()
+    assert services._open_paper_trades_rollover_at > rollover_at
+
+    # Trades opened on the new day are added to the reseeded index
+    new_trade = save_trade('NIFTY26DEC25100CE')
+    assert [trade.trade_uuid for trade in services.get_open_paper_trades()] == [new_trade]
+
+    services.close_paper_trades([(new_trade, 95.0, 'STOPLOSS', -375.0, -5.0)])
+    assert services.get_open_paper_trades() == ()
+    print("✅ Index reseeded for the new day")
+
+
+def test_open_trade_index_retries_failed_seed(temp_database, fresh_index, monkeypatch):
+    """A failed seed publishes nothing and is retried on the next read"""
+    print("🧪 Testing open paper trade index after a failed read")
+
+    trade_uuid = save_trade('NIFTY26DEC25000CE')
+
+    def locked(*args, **kwargs):
+        raise services.sqlite3.OperationalError('database is locked')
+        yield
+
+    with monkeypatch.context() as patched:
+        patched.setattr(services, 'iter_paper_trades', locked)
+        assert services.get_open_paper_trades() == ()
+        assert services._open_paper_trades_date is None
+        assert services._open_paper_trades_rollover_at == 0.0
+
+    assert [trade.trade_uuid for trade in services.get_open_paper_trades()] == [trade_uuid]
+    print("✅ Seed retried after a failed read")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Levels API Test Script
+Tests /levels/get conditional requests and /levels/stream output through the
+Flask test client, against a temporary database file (no running app needed)
+"""
+
+import sys
+import os
+import json
+from collections import OrderedDict
+
+import pytest
+
+# Add the parent directory to Python path (to import app)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for the app, backed by an empty database file"""
+    services.close_db_pool()
+    monkeypatch.setattr(services, 'DATABASE_FILE', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(services, 'SESSION_FILE', str(tmp_path / 'session_data.json'))
+    services.init_database()
+
+    # Imported here so the app's startup init_database() uses the temporary file
+    import app
+    monkeypatch.setattr(app, '_levels_body_cache', OrderedDict())
+
+    yield app.app.test_client()
+    services.close_db_pool()
+
+
+def test_get_levels_not_modified(client):
+    """/levels/get answers 304 when If-None-Match holds the current ETag"""
+    print("🧪 Testing /levels/get ETag handling")
+
+    services.save_level('default_user', 'NIFTY_50', 25000)
+    services.save_level('default_user', 'BANK_NIFTY', 52000)
+
+    response = client.get('/levels/get')
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+    etag, weak = response.get_etag()
+    assert etag and not weak
+
+    # Flask-Compress appends the encoding to the ETag of compressed responses
+    for tag in (etag, f"{etag}:br", f"{etag}:gzip"):
+        response = client.get('/levels/get', headers={'If-None-Match': f'"{tag}"'})
+        assert response.status_code == 304, tag
+        assert response.get_data() == b''
+        assert response.get_etag()[0] == etag
+
+    # A different filter is a different representation
+    response = client.get('/levels/get?index_type=NIFTY_50', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+
+    # Any write changes the version, so the old ETag no longer matches
+    services.save_level('default_user', 'NIFTY_50', 25100)
+    response = client.get('/levels/get', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert len(response.get_json()['levels']['NIFTY_50']) == 2
+    print("✅ 304 served for matching ETags, 200 after a change")
+
+
+def test_stream_levels_one_line_per_index_type(client):
+    """/levels/stream writes one NDJSON line per index type"""
+    print("🧪 Testing /levels/stream")
+
+    services.save_level('default_user', 'NIFTY_50', 25000)
+    services.save_level('default_user', 'NIFTY_50', 25200)
+    services.save_level('default_user', 'BANK_NIFTY', 52000)
+
+    response = client.get('/levels/stream')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['index_type'] for line in lines] == ['BANK_NIFTY', 'NIFTY_50']
+    assert [level['value'] for level in lines[0]['levels']] == [52000]
+    assert [level['value'] for level in lines[1]['levels']] == [25200, 25000]
+
+    # The index_type filter leaves a single line
+    response = client.get('/levels/stream?index_type=BANK_NIFTY')
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['index_type'] == 'BANK_NIFTY'
+    print("✅ One line streamed per index type")
+
+
+def test_stream_levels_reports_read_error(client, monkeypatch):
+    """A read error after streaming started ends the body with an error line"""
+    print("🧪 Testing /levels/stream read error")
+
+    import app
+
+    def failing_levels(*args, **kwargs):
+        yield 'BANK_NIFTY', {'uuid': 'a', 'value': 52000, 'updated_at': None, 'created_date': None}
+        raise services.sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(app, 'iter_levels', failing_levels)
+
+    response = client.get('/levels/stream')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {'success': False, 'error': 'database is locked'}
+    print("✅ Error line written after a failed read")